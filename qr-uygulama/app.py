@@ -1,29 +1,69 @@
-import io
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+import functools
+import hmac
 import os
 from pathlib import Path
 import secrets
-import json
+import threading
+import time
 import urllib.parse
-import urllib.request
 
-try:
-    import qrcode
-except ModuleNotFoundError:  # pragma: no cover
-    qrcode = None  # type: ignore[assignment]
-from flask import Flask, Response, redirect, render_template, request, url_for
+from flask import Flask, Response, g, make_response, redirect, render_template, request, stream_with_context, url_for
+from werkzeug.http import parse_accept_header, parse_etags
 from werkzeug.middleware.proxy_fix import ProxyFix
 
-from config_store import load_config, save_config
+from config_store import (
+    cached_config_snapshot,
+    config_cache_stats,
+    config_snapshot,
+    create_qr_tokens,
+    iter_active_qr_tokens,
+    load_config,
+    revoke_qr_tokens,
+    update_config,
+)
+import gate
+import gate_guard
+import metrics
+import precompress
+import qr_render
+import qr_sheet
+import scan_analytics
+import sync_client
+import sync_outbox
 
 
 RUN_ID = secrets.token_urlsafe(8)
-_SAVED_ONCE = False
-_LAST_SAVED_PATH: str | None = None
-_LAST_SAVE_ERROR: str | None = None
 
 app = Flask(__name__)
 app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_port=1, x_prefix=1)
 
+
+@app.before_request
+def _metrics_start() -> None:
+    g.metrics_t0 = time.perf_counter()
+
+
+@app.after_request
+def _metrics_record(response):
+    t0 = g.pop("metrics_t0", None)
+    if t0 is not None:
+        # Route template (/r/<token>), not the path: keeps the label set bounded.
+        rule = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        metrics.observe_request(rule, request.method, response.status_code, time.perf_counter() - t0)
+    return response
+
+
+@app.teardown_request
+def _metrics_failed(exc) -> None:
+    # after_request does not run for unhandled exceptions.
+    t0 = g.pop("metrics_t0", None)
+    if t0 is not None and exc is not None:
+        rule = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        metrics.observe_request(rule, request.method, 500, time.perf_counter() - t0)
+
+
 def _app_mode(cfg: dict) -> str:
     return (os.getenv("APP_MODE") or cfg.get("app_mode") or "full").strip()
 
@@ -45,6 +85,12 @@ def _public_base_url() -> str:
     return request.url_root.rstrip("/")
 
 
+def new_qr_token(cfg) -> str:
+    if (cfg.get("qr_payload_mode") or "default").strip() == "compact":
+        return "".join(secrets.choice(gate.COMPACT_ALPHABET) for _ in range(gate.COMPACT_TOKEN_LEN))
+    return secrets.token_urlsafe(18)
+
+
 def _get_active_qr_token(cfg: dict) -> str:
     """
     Returns the locally-active QR token.
@@ -54,9 +100,9 @@ def _get_active_qr_token(cfg: dict) -> str:
     token = str(cfg.get("active_qr_token") or "").strip()
     if token:
         return token
-    token = secrets.token_urlsafe(18)
+    token = new_qr_token(cfg)
     cfg["active_qr_token"] = token
-    save_config(cfg)
+    update_config({"active_qr_token": token})
     return token
 
 
@@ -64,20 +110,40 @@ def _rotate_active_qr_token(cfg: dict) -> str:
     """
     Generates a brand new QR token (invalidates previous QR on host once synced).
     """
-    token = secrets.token_urlsafe(18)
+    token = new_qr_token(cfg)
     cfg["active_qr_token"] = token
     # force re-sync to host
     cfg["last_sent_qr_token"] = ""
-    save_config(cfg)
+    update_config({"active_qr_token": token, "last_sent_qr_token": ""})
+    qr_render.clear_cache()
     return token
 
 
+def gate_payload(base: str, token: str) -> str:
+    """
+    QR content for a hosted gate token: <base>/r/<token>.
+    Compact tokens get the alphanumeric-mode form: <SCHEME://HOST>/R/<TOKEN>.
+    """
+    if gate.is_compact_token(token):
+        parts = urllib.parse.urlsplit(base.strip())
+        if parts.scheme and parts.netloc:
+            base = parts.scheme.upper() + "://" + parts.netloc.upper() + parts.path
+        return base.rstrip("/") + "/R/" + token
+    return base.rstrip("/") + "/r/" + token
+
+
+def saved_gate_base(cfg: dict) -> str:
+    base = (cfg.get("public_base_url") or "").strip()
+    if not base:
+        raise RuntimeError("remote_rotate_enabled=true ama public_base_url boş. Render host URL'nizi yazın.")
+    return base
+
+
 def _qr_payload_url(cfg: dict) -> str:
     # If rotation is enabled, QR should point to hosted gate endpoint (/r/<token>)
     if cfg.get("remote_rotate_enabled"):
         base = (cfg.get("public_base_url") or "").strip() or _public_base_url()
-        token = _get_active_qr_token(cfg)
-        return base.rstrip("/") + "/r/" + token
+        return gate_payload(base, _get_active_qr_token(cfg))
 
     mode = (cfg.get("qr_mode") or "info_page").strip()
 
@@ -108,7 +174,7 @@ def _guess_desktop_dir() -> Path:
     return Path.cwd() / "output"
 
 
-def _qr_payload_for_saved_png(cfg: dict) -> str:
+def qr_payload_for_saved_png(cfg: dict) -> str:
     """
     QR payload for the *saved* PNG (no request context).
     - If public_base_url is set, we use it for info_page mode.
@@ -116,11 +182,7 @@ def _qr_payload_for_saved_png(cfg: dict) -> str:
     """
     # If rotation is enabled, QR should point to hosted gate endpoint (/r/<token>)
     if cfg.get("remote_rotate_enabled"):
-        base = (cfg.get("public_base_url") or "").strip()
-        if not base:
-            raise RuntimeError("remote_rotate_enabled=true ama public_base_url boş. Render host URL'nizi yazın.")
-        token = _get_active_qr_token(cfg)
-        return base.rstrip("/") + "/r/" + token
+        return gate_payload(saved_gate_base(cfg), _get_active_qr_token(cfg))
 
     mode = (cfg.get("qr_mode") or "info_page").strip()
     if mode == "target_url":
@@ -137,49 +199,120 @@ def _qr_payload_for_saved_png(cfg: dict) -> str:
     return _with_query(base.rstrip("/") + "/info", {"rid": RUN_ID})
 
 
-def save_qr_png_to_desktop(cfg: dict) -> Path:
-    if qrcode is None:
-        raise RuntimeError(
-            "QR üretimi için paket eksik: 'qrcode'. "
-            "Kurulum: pip install -r requirements.txt"
-        )
+def render_desktop_qr(
+    cfg: dict,
+    fmt: str | None = None,
+    error_correction: str | None = None,
+    box_size: int | None = None,
+    border: int | None = None,
+) -> tuple[Path, bytes]:
+    """
+    Renders the desktop QR image in memory: (target path, encoded bytes). Options default
+    to qr_output_format, qr_error_correction, qr_box_size and qr_border from config.
+    """
+    fmt, error_correction, box_size, border = qr_render.normalize_options(
+        fmt or cfg.get("qr_output_format"),
+        error_correction or cfg.get("qr_error_correction"),
+        box_size if box_size is not None else cfg.get("qr_box_size"),
+        border if border is not None else cfg.get("qr_border"),
+    )
     desktop = _guess_desktop_dir()
     filename = (cfg.get("qr_output_filename") or "qr.png").strip() or "qr.png"
     out_path = desktop / filename
-    out_path.parent.mkdir(parents=True, exist_ok=True)
+    if out_path.suffix.lower() in (".png", ".svg"):
+        out_path = out_path.with_suffix("." + fmt)
 
-    payload = _qr_payload_for_saved_png(cfg)
-    qr = qrcode.QRCode(  # type: ignore[union-attr]
-        version=None,
-        error_correction=qrcode.constants.ERROR_CORRECT_M,  # type: ignore[union-attr]
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(payload)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    img.save(out_path, format="PNG")
+    payload = qr_payload_for_saved_png(cfg)
+    # Same cache as /qr.png: the desktop file and the HTTP response share one render.
+    data, _ = qr_render.render(payload, fmt, error_correction, box_size, border)
+    return out_path, data
+
+
+def write_desktop_qr(out_path: Path, data: bytes) -> Path:
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_bytes(data)
     return out_path
 
 
-def _maybe_save_once(cfg: dict) -> None:
-    global _SAVED_ONCE, _LAST_SAVED_PATH, _LAST_SAVE_ERROR
-    if _SAVED_ONCE:
-        return
-    if not cfg.get("qr_save_to_desktop", True):
-        _SAVED_ONCE = True
-        _LAST_SAVED_PATH = None
-        _LAST_SAVE_ERROR = None
-        return
-    try:
-        out = save_qr_png_to_desktop(cfg)
-        _SAVED_ONCE = True
-        _LAST_SAVED_PATH = str(out)
-        _LAST_SAVE_ERROR = None
-    except Exception as e:
-        _SAVED_ONCE = True
-        _LAST_SAVED_PATH = None
-        _LAST_SAVE_ERROR = repr(e)
+def save_qr_png_to_desktop(
+    cfg: dict,
+    fmt: str | None = None,
+    error_correction: str | None = None,
+    box_size: int | None = None,
+    border: int | None = None,
+) -> Path:
+    """
+    Saves the QR image to Desktop (see render_desktop_qr for the options).
+    """
+    return write_desktop_qr(*render_desktop_qr(cfg, fmt, error_correction, box_size, border))
+
+
+class _DesktopSaveJob:
+    """
+    Desktop QR save, run off the request path on a single background worker.
+
+    State (lock-protected): "idle" (not requested yet), "disabled" (qr_save_to_desktop
+    is off), "pending", "saved" (path) or "error" (error). A newer request supersedes a
+    queued or running one: only the latest job's outcome is recorded.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self._seq = 0
+        self._state = "idle"
+        self._path: str | None = None
+        self._error: str | None = None
+        self._future: Future | None = None
+
+    def request(self, cfg: dict, force: bool = False) -> None:
+        """
+        Queues a save (once per run unless force, e.g. after a new QR) and returns at once.
+        """
+        with self._lock:
+            if self._state != "idle" and not force:
+                return
+            self._seq += 1
+            seq = self._seq
+            self._path = self._error = None
+            if not cfg.get("qr_save_to_desktop", True):
+                self._state = "disabled"
+                self._future = None
+                return
+            self._state = "pending"
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="desktop-save")
+            self._future = self._executor.submit(self._run, seq, dict(cfg))
+
+    def _run(self, seq: int, cfg: dict) -> None:
+        if seq != self._seq:
+            return  # superseded while queued
+        try:
+            path, error = str(save_qr_png_to_desktop(cfg)), None
+        except Exception as e:
+            path, error = None, repr(e)
+        with self._lock:
+            if seq != self._seq:
+                return
+            self._state = "saved" if path else "error"
+            self._path, self._error = path, error
+
+    def status(self) -> dict:
+        with self._lock:
+            return {"state": self._state, "path": self._path, "error": self._error}
+
+    def wait(self, timeout: float | None = None) -> dict:
+        with self._lock:
+            future = self._future
+        if future is not None:
+            try:
+                future.result(timeout)
+            except FutureTimeout:
+                pass
+        return self.status()
+
+
+_DESKTOP_SAVE = _DesktopSaveJob()
 
 
 @app.get("/")
@@ -187,50 +320,117 @@ def index():
     cfg = load_config()
     if _is_host_only(cfg):
         return redirect(url_for("info"))
-    _maybe_save_once(cfg)
+    _DESKTOP_SAVE.request(cfg)
     payload = _qr_payload_url(cfg)
-    return render_template(
-        "index.html",
-        cfg=cfg,
-        payload=payload,
-        run_id=RUN_ID,
-        saved_path=_LAST_SAVED_PATH,
-        save_error=_LAST_SAVE_ERROR,
+    resp = make_response(
+        render_template(
+            "index.html",
+            cfg=cfg,
+            payload=payload,
+            run_id=RUN_ID,
+            save=_DESKTOP_SAVE.status(),
+        )
     )
+    resp.add_etag()
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp.make_conditional(request)
+
+
+# (inputs, etag, {coding: body}) of the last rendered /info page; re-rendered only when
+# the fields it shows change (i.e. after /api/config or /admin writes).
+_INFO_PAGE: tuple | None = None
+
+
+def _info_max_age() -> int:
+    try:
+        return max(0, int(os.getenv("QR_INFO_MAX_AGE") or 60))
+    except ValueError:
+        return 60
+
+
+def _info_inputs(cfg) -> tuple:
+    return (
+        cfg.get("info_title") or "Bilgiler",
+        cfg.get("info_body") or "",
+        (cfg.get("target_url") or "").strip(),
+    )
+
+
+def info_page(cfg) -> tuple:
+    global _INFO_PAGE
+    inputs = _info_inputs(cfg)
+    page = _INFO_PAGE
+    if page is None or page[0] != inputs:
+        with app.app_context():
+            html = render_template("info.html", title=inputs[0], body=inputs[1], target_url=inputs[2])
+        data = html.encode("utf-8")
+        page = (inputs, precompress.etag(data), precompress.encode(data))
+        _INFO_PAGE = page
+    return page
+
+
+def info_http(accept_encoding: str, if_none_match: str) -> tuple[int, dict, bytes]:
+    """
+    (status, headers, body) of GET /info; shared by the Flask route and asgi.py.
+    """
+    _, etag, variants = info_page(config_snapshot())
+    coding = precompress.negotiate(parse_accept_header(accept_encoding), variants)
+    if coding != "identity":
+        etag = f"{etag}-{coding}"
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": f"public, max-age={_info_max_age()}",
+        "Vary": "Accept-Encoding",
+    }
+    if if_none_match and parse_etags(if_none_match).contains_weak(etag):
+        return 304, headers, b""
+    if coding != "identity":
+        headers["Content-Encoding"] = coding
+    headers["Content-Type"] = "text/html; charset=utf-8"
+    return 200, headers, variants[coding]
+
+
+def info_cached() -> bool:
+    """
+    True if info_http() needs neither a config reload nor a render (asgi.py).
+    """
+    cfg = cached_config_snapshot()
+    page = _INFO_PAGE
+    return cfg is not None and page is not None and page[0] == _info_inputs(cfg)
 
 
 @app.get("/info")
 def info():
-    cfg = load_config()
-    return render_template(
-        "info.html",
-        title=cfg.get("info_title") or "Bilgiler",
-        body=cfg.get("info_body") or "",
-        target_url=(cfg.get("target_url") or "").strip(),
+    """
+    Rendered once per content version and pre-encoded (gzip, brotli if installed);
+    strong ETag per encoding, conditional GET (304) and Cache-Control for CDNs/browsers.
+    """
+    status, headers, body = info_http(
+        request.headers.get("Accept-Encoding", ""), request.headers.get("If-None-Match", "")
     )
+    return Response(body, status=status, headers=headers)
 
 
 @app.get("/r/<token>")
+@app.get("/R/<token>")
 def rotate_redirect(token: str):
     """
-    Gate endpoint:
+    Gate endpoint (/R/ is the alphanumeric-mode spelling used by compact QRs):
     - If token matches current_qr_token -> redirect to static_redirect_url
+    - Else if token is in the token table (not revoked / expired) -> redirect to its URL
     - Else -> 410 Gone (old QR invalid)
+    Lookups other than the current token go through gate_guard (negative cache;
+    misses are rate limited per IP / globally -> 429).
     """
-    cfg = load_config()
-    current = (cfg.get("current_qr_token") or "").strip()
-    redirect_url = (cfg.get("static_redirect_url") or "").strip()
-    if not current or not redirect_url:
-        return (
-            "QR henüz aktif edilmedi (Not configured).\n"
-            "Bu host'a ilk token'ı göndermek için bilgisayarındaki uygulamayı 1 kez çalıştırıp\n"
-            "remote_rotate_enabled=true iken /api/rotate çağrısını yaptırmalısın.\n",
-            410,
-            {"Content-Type": "text/plain; charset=utf-8"},
-        )
-    if token != current:
-        return ("QR artık geçersiz (yeni QR üretildi).", 410)
-    return redirect(redirect_url, code=302)
+    code, value = gate_guard.check(token, request.remote_addr or "")
+    if code == 429:
+        return (value, 429, {"Content-Type": "text/plain; charset=utf-8", "Retry-After": str(gate_guard.RETRY_AFTER_S)})
+    scan_analytics.record(token, code == 302, request.headers.get("User-Agent") or "")
+    if code == 302:
+        return redirect(value, code=302)
+    if value == gate.NOT_CONFIGURED_MESSAGE:
+        return (value, 410, {"Content-Type": "text/plain; charset=utf-8"})
+    return (value, 410)
 
 
 @app.get("/status")
@@ -239,22 +439,69 @@ def status():
     Small, non-sensitive health/config status endpoint.
     Does NOT expose tokens.
     """
-    cfg = load_config()
+    return status_payload()
+
+
+def status_payload() -> dict:
+    # No request context needed: also served by the WSGI fast path (wsgi.py).
+    cfg = config_snapshot()
     return {
         "ok": True,
         "app_mode": _app_mode(cfg),
         "has_current_qr_token": bool((cfg.get("current_qr_token") or "").strip()),
         "has_static_redirect_url": bool((cfg.get("static_redirect_url") or "").strip()),
         "remote_rotate_enabled": bool(cfg.get("remote_rotate_enabled")),
+        "config_cache": config_cache_stats(),
+        "sync_outbox": sync_outbox.stats(),
+        "gate_guard": gate_guard.stats(),
     }
 
 
-@app.get("/qr.png")
-def qr_png():
+@app.get("/status/scans")
+def status_scans():
+    """
+    Scan counters per token (hits vs 410s, user-agent classes, per hour).
+    Auth: Authorization: Bearer <ADMIN_TOKEN>
+    Query: ?hours=48
+    """
+    cfg = config_snapshot()
+    if not _require_bearer(cfg):
+        return ({"ok": False, "error": "unauthorized"}, 401)
+    hours = max(1, min(24 * 31, request.args.get("hours", type=int) or 48))
+    return {"ok": True, "enabled": scan_analytics.enabled(), **scan_analytics.summary(hours)}
+
+
+@app.get("/status/sync")
+def status_sync():
+    """
+    Pending remote pushes, including the last error (host URL and response body).
+    Auth: Authorization: Bearer <ADMIN_TOKEN>
+    """
+    cfg = config_snapshot()
+    if not _require_bearer(cfg):
+        return ({"ok": False, "error": "unauthorized"}, 401)
+    return {"ok": True, **sync_outbox.stats(include_errors=True)}
+
+
+@app.get("/metrics")
+def metrics_text():
+    """
+    Prometheus text format, summed over all workers (see metrics.py).
+    Auth: Authorization: Bearer <ADMIN_TOKEN>
+    """
+    cfg = config_snapshot()
+    if not _require_bearer(cfg):
+        return ({"ok": False, "error": "unauthorized"}, 401)
+    if not metrics.enabled():
+        return ({"ok": False, "error": "metrics disabled (QR_METRICS=0)"}, 404)
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def _qr_image_response(fmt: str):
     cfg = load_config()
     if _is_host_only(cfg):
         return ("Not Found", 404)
-    if qrcode is None:
+    if not qr_render.available():
         return (
             "QR üretimi için 'qrcode' paketi kurulu değil.\n"
             "Kurulum:\n"
@@ -264,25 +511,49 @@ def qr_png():
         )
     payload = _qr_payload_url(cfg)
 
-    qr = qrcode.QRCode(  # type: ignore[union-attr]
-        version=None,
-        error_correction=qrcode.constants.ERROR_CORRECT_M,  # type: ignore[union-attr]
-        box_size=10,
-        border=4,
+    fmt, ec, box_size, border = qr_render.normalize_options(
+        fmt,
+        request.args.get("ec"),
+        request.args.get("box"),
+        request.args.get("border"),
     )
-    qr.add_data(payload)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
+    data, etag = qr_render.render(payload, fmt, ec, box_size, border)
+    resp = Response(data, mimetype=qr_render.FORMATS[fmt])
+    resp.set_etag(etag)
+    # Always revalidate (the token can rotate), but unchanged QRs cost a 304.
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.vary.add("Accept")
+    return resp.make_conditional(request)
+
+
+@app.get("/qr.png")
+def qr_png():
+    """
+    QR image. Query: ?format=png|svg &ec=L|M|Q|H &box=<px per module> &border=<modules>
+    Without ?format, an Accept header that strictly prefers image/svg+xml gets SVG
+    (browsers' generic image/* Accept keeps getting PNG).
+    """
+    fmt = request.args.get("format")
+    if not fmt:
+        accept = request.accept_mimetypes
+        fmt = "svg" if accept["image/svg+xml"] > accept["image/png"] else "png"
+    return _qr_image_response(fmt)
+
 
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    buf.seek(0)
-    return Response(buf.getvalue(), mimetype="image/png")
+@app.get("/qr.svg")
+def qr_svg():
+    return _qr_image_response("svg")
+
+
+def _admin_token_matches(cfg: dict, token: str) -> bool:
+    # Constant-time, like the gate's token check: this token guards /metrics and the APIs.
+    expected = cfg.get("admin_token") or ""
+    return bool(token) and bool(expected) and hmac.compare_digest(token.encode("utf-8"), expected.encode("utf-8"))
 
 
 def _require_admin(cfg: dict) -> bool:
     token = (request.args.get("token") or "").strip()
-    return bool(token) and token == (cfg.get("admin_token") or "")
+    return _admin_token_matches(cfg, token)
 
 
 def _require_bearer(cfg: dict) -> bool:
@@ -290,15 +561,68 @@ def _require_bearer(cfg: dict) -> bool:
     if not auth.lower().startswith("bearer "):
         return False
     token = auth.split(" ", 1)[1].strip()
-    return bool(token) and token == (cfg.get("admin_token") or "")
+    return _admin_token_matches(cfg, token)
+
+
+# Idempotency-Key -> JSON reply of the sync POST that carried it (per worker; the
+# pushes are idempotent anyway, this only saves the config write on outbox retries).
+_IDEMPOTENT_REPLIES: "OrderedDict[str, dict]" = OrderedDict()
+_IDEMPOTENT_MAX = 256
+_IDEMPOTENT_LOCK = threading.Lock()
+
+
+def _idempotent(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = (request.headers.get("Idempotency-Key") or "").strip()[:64]
+        if key and _require_bearer(config_snapshot()):
+            with _IDEMPOTENT_LOCK:
+                reply = _IDEMPOTENT_REPLIES.get(key)
+            if reply is not None:
+                return {**reply, "replayed": True}
+        rv = view(*args, **kwargs)
+        body = rv[0] if isinstance(rv, tuple) else rv
+        if key and isinstance(body, dict) and body.get("ok"):
+            with _IDEMPOTENT_LOCK:
+                _IDEMPOTENT_REPLIES[key] = body
+                while len(_IDEMPOTENT_REPLIES) > _IDEMPOTENT_MAX:
+                    _IDEMPOTENT_REPLIES.popitem(last=False)
+        return rv
+
+    return wrapper
+
+
+def _sync_preconditions(cfg: dict, parts: dict):
+    """
+    Evaluates If-None-Match / If-Match of a sync POST; parts = {"info"|"rotate": changes}.
+    Returns (early_response or None, etag of the state after applying the changes).
+    - If-None-Match matches and the host already has exactly this state -> 304, no write
+    - If-Match given and the host's current state differs -> 412 (lost update)
+    """
+    current = {}
+    desired = {}
+    for kind, changes in parts.items():
+        have = {k: cfg.get(k) if cfg.get(k) is not None else type(v)() for k, v in changes.items()}
+        current[kind] = sync_client.part_etag(have)
+        desired[kind] = sync_client.part_etag(changes)
+    current_etag = sync_client.state_etag(current)
+    desired_etag = sync_client.state_etag(desired)
+    if current_etag == desired_etag and request.if_none_match.contains(desired_etag):
+        return ("", 304, {"ETag": f'"{current_etag}"'}), desired_etag
+    if request.if_match and not request.if_match.contains(current_etag):
+        body = {"ok": False, "error": "precondition_failed"}
+        return (body, 412, {"ETag": f'"{current_etag}"'}), desired_etag
+    return None, desired_etag
 
 
 @app.post("/api/config")
+@_idempotent
 def api_config_update():
     """
     Update visible info on the hosted instance.
     Auth: Authorization: Bearer <ADMIN_TOKEN>
     Body: JSON with allowed fields (info_title, info_body, qr_mode, target_url, append_run_id_to_target_url)
+    Optional If-None-Match / If-Match (304 / 412, see _sync_preconditions); replies carry an ETag.
     """
     cfg = load_config()
     if not _require_bearer(cfg):
@@ -308,6 +632,16 @@ def api_config_update():
     if not isinstance(data, dict):
         return ({"ok": False, "error": "invalid_json"}, 400)
 
+    changes = _info_changes(data)
+    early, etag = _sync_preconditions(cfg, {"info": changes})
+    if early is not None:
+        return early
+    if changes:
+        update_config(changes)
+    return ({"ok": True}, 200, {"ETag": f'"{etag}"'})
+
+
+def _info_changes(data: dict) -> dict:
     allowed = {
         "info_title",
         "info_body",
@@ -319,27 +653,36 @@ def api_config_update():
         if k not in allowed:
             data.pop(k, None)
 
+    changes = {}
     if "info_title" in data:
-        cfg["info_title"] = str(data["info_title"])
+        changes["info_title"] = str(data["info_title"])
     if "info_body" in data:
-        cfg["info_body"] = str(data["info_body"])
+        changes["info_body"] = str(data["info_body"])
     if "qr_mode" in data:
-        cfg["qr_mode"] = str(data["qr_mode"])
+        changes["qr_mode"] = str(data["qr_mode"])
     if "target_url" in data:
-        cfg["target_url"] = str(data["target_url"]).strip()
+        changes["target_url"] = str(data["target_url"]).strip()
     if "append_run_id_to_target_url" in data:
-        cfg["append_run_id_to_target_url"] = bool(data["append_run_id_to_target_url"])
+        changes["append_run_id_to_target_url"] = bool(data["append_run_id_to_target_url"])
+    return changes
 
-    save_config(cfg)
-    return {"ok": True}
+
+def _rotate_changes(data: dict) -> dict | None:
+    token = str(data.get("current_qr_token") or "").strip()
+    url = str(data.get("static_redirect_url") or "").strip()
+    if not token or not url:
+        return None
+    return {"current_qr_token": token, "static_redirect_url": url}
 
 
 @app.post("/api/rotate")
+@_idempotent
 def api_rotate_update():
     """
     Update current QR token + redirect URL on hosted instance.
     Auth: Authorization: Bearer <ADMIN_TOKEN>
     Body JSON: {\"current_qr_token\": \"...\", \"static_redirect_url\": \"https://...\"}
+    Optional If-None-Match / If-Match (304 / 412, see _sync_preconditions); replies carry an ETag.
     """
     cfg = load_config()
     if not _require_bearer(cfg):
@@ -349,77 +692,301 @@ def api_rotate_update():
     if not isinstance(data, dict):
         return ({"ok": False, "error": "invalid_json"}, 400)
 
-    token = str(data.get("current_qr_token") or "").strip()
-    url = str(data.get("static_redirect_url") or "").strip()
-    if not token or not url:
+    changes = _rotate_changes(data)
+    if changes is None:
         return ({"ok": False, "error": "missing_fields"}, 400)
 
-    cfg["current_qr_token"] = token
-    cfg["static_redirect_url"] = url
-    save_config(cfg)
-    return {"ok": True}
+    early, etag = _sync_preconditions(cfg, {"rotate": changes})
+    if early is not None:
+        return early
+    update_config(changes)
+    return ({"ok": True}, 200, {"ETag": f'"{etag}"'})
 
 
-def sync_info_to_remote(cfg: dict) -> None:
-    if not cfg.get("remote_sync_enabled"):
-        return
-    base = (cfg.get("remote_base_url") or "").strip().rstrip("/")
-    token = (cfg.get("remote_admin_token") or "").strip()
-    if not base or not token:
-        raise RuntimeError("remote_base_url veya remote_admin_token eksik.")
+@app.post("/api/sync")
+@_idempotent
+def api_sync_update():
+    """
+    /api/config + /api/rotate in one request (and one config write).
+    Auth: Authorization: Bearer <ADMIN_TOKEN>
+    Body JSON: {"info": {...same fields as /api/config...},
+                "rotate": {"current_qr_token": "...", "static_redirect_url": "https://..."}}
+    Either part may be omitted. If-None-Match / If-Match cover the parts present.
+    """
+    cfg = load_config()
+    if not _require_bearer(cfg):
+        return ({"ok": False, "error": "unauthorized"}, 401)
+
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return ({"ok": False, "error": "invalid_json"}, 400)
+
+    parts = {}
+    info = data.get("info")
+    if info is not None:
+        if not isinstance(info, dict):
+            return ({"ok": False, "error": "invalid_json"}, 400)
+        parts["info"] = _info_changes(info)
+    rotate = data.get("rotate")
+    if rotate is not None:
+        rotate_changes = _rotate_changes(rotate) if isinstance(rotate, dict) else None
+        if rotate_changes is None:
+            return ({"ok": False, "error": "missing_fields"}, 400)
+        parts["rotate"] = rotate_changes
+
+    early, etag = _sync_preconditions(cfg, parts)
+    if early is not None:
+        return early
+    changes = {k: v for part in parts.values() for k, v in part.items()}
+    if changes:
+        update_config(changes)
+    return ({"ok": True}, 200, {"ETag": f'"{etag}"'})
+
+
+_MAX_TOKENS_PER_REQUEST = 10000
+_TOKEN_CHARS = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_")
+
+
+def _valid_token(token: str) -> bool:
+    return 0 < len(token) <= 128 and all(ch in _TOKEN_CHARS for ch in token)
+
+
+def _valid_redirect_url(url: str) -> bool:
+    return url.startswith("https://") or url.startswith("http://")
+
+
+@app.post("/api/tokens")
+def api_tokens_create():
+    """
+    Bulk-create gate tokens on the hosted instance.
+    Auth: Authorization: Bearer <ADMIN_TOKEN>
+    Body JSON (either form):
+      {"tokens": [{"token": "...", "redirect_url": "https://...", "expires_at": 1700000000, "label": "..."}, ...]}
+      {"count": 100, "redirect_url": "https://...", "ttl_seconds": 86400}
+    Missing tokens are generated; missing redirect_url falls back to static_redirect_url.
+    Re-sent tokens are updated in place: created_at is kept and a revoked token stays revoked.
+    """
+    cfg = config_snapshot()
+    if not _require_bearer(cfg):
+        return ({"ok": False, "error": "unauthorized"}, 401)
 
-    url = base + "/api/config"
-    payload = {
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return ({"ok": False, "error": "invalid_json"}, 400)
+
+    now = int(time.time())
+    items = data.get("tokens")
+    if items is None:
+        try:
+            count = int(data.get("count") or 0)
+        except (TypeError, ValueError):
+            return ({"ok": False, "error": "invalid_count"}, 400)
+        items = [{"redirect_url": data.get("redirect_url"), "ttl_seconds": data.get("ttl_seconds")}] * count
+    if not isinstance(items, list) or not items:
+        return ({"ok": False, "error": "missing_fields"}, 400)
+    if len(items) > _MAX_TOKENS_PER_REQUEST:
+        return ({"ok": False, "error": "too_many_tokens"}, 400)
+
+    records = []
+    for item in items:
+        if not isinstance(item, dict):
+            return ({"ok": False, "error": "invalid_json"}, 400)
+        token = str(item.get("token") or "").strip() or new_qr_token(cfg)
+        url = str(item.get("redirect_url") or "").strip()
+        if not _valid_token(token) or (url and not _valid_redirect_url(url)):
+            return ({"ok": False, "error": "invalid_token", "token": token}, 400)
+        try:
+            expires_at = item.get("expires_at")
+            if expires_at is None and item.get("ttl_seconds"):
+                expires_at = now + int(item["ttl_seconds"])
+            expires_at = int(expires_at) if expires_at is not None else None
+        except (TypeError, ValueError):
+            return ({"ok": False, "error": "invalid_expiry", "token": token}, 400)
+        records.append(
+            {
+                "token": token,
+                "redirect_url": url,
+                "label": str(item.get("label") or "")[:200],
+                "created_at": now,
+                "expires_at": expires_at,
+                "revoked": False,
+            }
+        )
+
+    create_qr_tokens(records)
+    return {"ok": True, "tokens": [r["token"] for r in records]}
+
+
+@app.post("/api/tokens/revoke")
+def api_tokens_revoke():
+    """
+    Bulk-revoke gate tokens (they start answering 410).
+    Auth: Authorization: Bearer <ADMIN_TOKEN>
+    Body JSON: {"tokens": ["...", ...]}
+    """
+    cfg = config_snapshot()
+    if not _require_bearer(cfg):
+        return ({"ok": False, "error": "unauthorized"}, 401)
+
+    data = request.get_json(silent=True) or {}
+    tokens = data.get("tokens") if isinstance(data, dict) else None
+    if not isinstance(tokens, list) or not tokens:
+        return ({"ok": False, "error": "missing_fields"}, 400)
+    if len(tokens) > _MAX_TOKENS_PER_REQUEST:
+        return ({"ok": False, "error": "too_many_tokens"}, 400)
+
+    revoked = revoke_qr_tokens([str(t).strip() for t in tokens if str(t).strip()])
+    return {"ok": True, "revoked": revoked}
+
+
+def info_payload(cfg: dict) -> dict:
+    return {
         "info_title": cfg.get("info_title") or "",
         "info_body": cfg.get("info_body") or "",
     }
-    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
-    req = urllib.request.Request(
-        url,
-        data=body,
-        headers={
-            "Content-Type": "application/json; charset=utf-8",
-            "Authorization": f"Bearer {token}",
-        },
-        method="POST",
-    )
-    with urllib.request.urlopen(req, timeout=15) as resp:
-        _ = resp.read()
-
 
-def sync_rotate_to_remote(cfg: dict) -> None:
-    if not cfg.get("remote_rotate_enabled"):
-        return
-    base = (cfg.get("remote_base_url") or "").strip().rstrip("/")
-    token = (cfg.get("remote_admin_token") or "").strip()
-    if not base or not token:
-        raise RuntimeError("remote_base_url veya remote_admin_token eksik.")
 
+def rotate_payload(cfg: dict) -> dict:
     static_url = (cfg.get("static_redirect_url") or "").strip()
     if not static_url:
         raise RuntimeError("static_redirect_url eksik.")
-
-    active = _get_active_qr_token(cfg)
-
-    url = base + "/api/rotate"
-    payload = {
-        "current_qr_token": active,
+    return {
+        "current_qr_token": _get_active_qr_token(cfg),
         "static_redirect_url": static_url,
     }
-    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
-    req = urllib.request.Request(
-        url,
-        data=body,
-        headers={
-            "Content-Type": "application/json; charset=utf-8",
-            "Authorization": f"Bearer {token}",
-        },
-        method="POST",
+
+
+def _mark_rotation_sent(cfg: dict, token: str) -> None:
+    if cfg.get("last_sent_qr_token") == token:
+        return
+    cfg["last_sent_qr_token"] = token
+    update_config({"last_sent_qr_token": token})
+
+
+_PART_ENDPOINTS = {"info": "/api/config", "rotate": "/api/rotate"}
+
+
+def _part_headers(part_etags: dict, acked: dict | None) -> dict:
+    """
+    If-None-Match: the state we are about to push (host answers 304 if it already has it).
+    If-Match: the state this host last acknowledged (412 if someone changed it meanwhile).
+    """
+    headers = {"If-None-Match": '"%s"' % sync_client.state_etag(part_etags)}
+    if acked is not None and all(kind in acked for kind in part_etags):
+        headers["If-Match"] = '"%s"' % sync_client.state_etag({kind: acked[kind] for kind in part_etags})
+    return headers
+
+
+def _push_parts(cfg: dict, kinds: dict, force: bool = False) -> list:
+    """
+    Pushes {"info"|"rotate": payload} to every host concurrently. Per host, only the parts
+    whose content hash differs from what that host last acknowledged are sent (nothing at
+    all if none changed), in one /api/sync request or, with a single part / on hosts
+    without /api/sync, via /api/config and /api/rotate.
+
+    Hosts that still failed after the in-line retries get the parts queued in the durable
+    outbox; 412 (the host's state was changed by someone else since our last push) is
+    not queued but reported, `force=True` overwrites it. A full success supersedes
+    whatever was still queued.
+    """
+    etags = {kind: sync_client.part_etag(payload) for kind, payload in kinds.items()}
+    acked_all = {} if force else sync_outbox.acked_etags()
+
+    def push(client: sync_client.SyncClient) -> bool:
+        acked = None if force else acked_all.get(client.base_url, {})
+        parts = [kind for kind in kinds if acked is None or acked.get(kind) != etags[kind]]
+        if not parts:
+            return True
+        replies = []
+        if len(parts) > 1:
+            try:
+                replies.append(
+                    client.post_json(
+                        "/api/sync",
+                        {kind: kinds[kind] for kind in parts},
+                        _part_headers({kind: etags[kind] for kind in parts}, acked),
+                    )
+                )
+                parts = []
+            except sync_client.SyncError as e:
+                if e.status != 404:
+                    raise
+        for kind in parts:
+            replies.append(
+                client.post_json(_PART_ENDPOINTS[kind], kinds[kind], _part_headers({kind: etags[kind]}, acked))
+            )
+        sync_outbox.record_acked(client.base_url, etags)
+        return all(reply.get("unchanged") for reply in replies)
+
+    results = sync_client.fan_out(
+        sync_client.clients_for_config(cfg), push, sync_client.retries_for_config(cfg)
     )
-    with urllib.request.urlopen(req, timeout=15) as resp:
-        _ = resp.read()
-    cfg["last_sent_qr_token"] = active
-    save_config(cfg)
+    failed = [r["host"] for r in results if not r["ok"] and r["status"] != 412]
+    for kind, payload in kinds.items():
+        if failed:
+            sync_outbox.enqueue(kind, payload, failed)
+        elif all(r["ok"] for r in results):
+            sync_outbox.discard(kind)
+    if not all(r["ok"] for r in results):
+        raise sync_client.FanOutError(results)
+    return results
+
+
+def sync_info_to_remote(cfg: dict, force: bool = False) -> list:
+    if not cfg.get("remote_sync_enabled"):
+        return []
+    return _push_parts(cfg, {"info": info_payload(cfg)}, force)
+
+
+def sync_rotate_to_remote(cfg: dict, force: bool = False) -> list:
+    if not cfg.get("remote_rotate_enabled"):
+        return []
+    payload = rotate_payload(cfg)
+    results = _push_parts(cfg, {"rotate": payload}, force)
+    _mark_rotation_sent(cfg, payload["current_qr_token"])
+    return results
+
+
+def sync_all_to_remote(cfg: dict, force: bool = False) -> list:
+    """
+    Pushes info (if remote_sync_enabled) and rotation (if remote_rotate_enabled) to
+    every host in remote_base_url (see _push_parts). Unchanged state costs no request.
+    Returns the per-host report; raises sync_client.FanOutError if any host failed
+    (the rotation then counts as not sent).
+    """
+    kinds = {}
+    if cfg.get("remote_sync_enabled"):
+        kinds["info"] = info_payload(cfg)
+    if cfg.get("remote_rotate_enabled"):
+        kinds["rotate"] = rotate_payload(cfg)
+    if not kinds:
+        return []
+    results = _push_parts(cfg, kinds, force)
+    if "rotate" in kinds:
+        _mark_rotation_sent(cfg, kinds["rotate"]["current_qr_token"])
+    return results
+
+
+def print_sync_outcome(cfg: dict, results: list | None, error: Exception | None) -> None:
+    """
+    Console report shared by app.py / sync_remote.py / generate_and_sync.py.
+    """
+    if not (cfg.get("remote_sync_enabled") or cfg.get("remote_rotate_enabled")):
+        return
+    if error is not None:
+        print("Remote sync: FAILED:", error if isinstance(error, sync_client.FanOutError) else repr(error))
+        results = getattr(error, "results", None)
+        if any(r.get("status") == 412 for r in results or ()):
+            print("  Host'taki bilgiler bu arada başka yerden değiştirilmiş (412).")
+            print("  Üzerine yazmak için: python sync_remote.py --force")
+    else:
+        if cfg.get("remote_sync_enabled"):
+            print("Remote sync: OK")
+        if cfg.get("remote_rotate_enabled"):
+            print("Remote rotate: OK")
+    if results and (len(results) > 1 or error is not None or results[0].get("unchanged")):
+        for line in sync_client.format_report(results):
+            print("  " + line)
 
 
 @app.post("/admin/new_qr")
@@ -433,23 +1000,52 @@ def admin_new_qr_post():
     # Explicitly rotate token (this is the only time we invalidate previous QR)
     _ = _rotate_active_qr_token(cfg)
 
-    # Try to sync new token to host (if enabled)
+    # Try to sync new token to host (if enabled). Hosts that could not be reached get
+    # the rotation queued in the durable outbox (sync_outbox), drained in the background.
     try:
         sync_rotate_to_remote(cfg)
-    except Exception:
-        # Keep going: local QR can still be saved, sync can be retried later.
-        pass
+    except sync_client.FanOutError as e:
+        app.logger.warning("Rotation sync queued for retry: %s", e)
+    except Exception as e:
+        app.logger.warning("Rotation sync failed: %r", e)
 
-    # Re-generate saved png (if enabled)
-    global _SAVED_ONCE, _LAST_SAVED_PATH, _LAST_SAVE_ERROR
-    _SAVED_ONCE = False
-    _LAST_SAVED_PATH = None
-    _LAST_SAVE_ERROR = None
-    _maybe_save_once(cfg)
+    # Re-generate saved png (if enabled), in the background
+    _DESKTOP_SAVE.request(cfg, force=True)
 
     return redirect(url_for("admin_get", token=cfg.get("admin_token")))
 
 
+@app.get("/admin/sheet.pdf")
+def admin_sheet_pdf():
+    """
+    Printable A4 sheet (PDF, streamed) of all active gate tokens, labelled.
+    Query: ?token=<admin_token> &cols=3 &rows=4 &ec=M
+    With an empty token table the sheet holds just the current QR.
+    """
+    cfg = load_config()
+    if not _require_admin(cfg):
+        return ("Yetkisiz.", 401)
+
+    base = (cfg.get("public_base_url") or "").strip() or _public_base_url()
+    _, ec, _, _ = qr_render.normalize_options(error_correction=request.args.get("ec"))
+    cols = request.args.get("cols", type=int) or 3
+    rows = request.args.get("rows", type=int) or 4
+
+    def items():
+        any_token = False
+        for token, rec in iter_active_qr_tokens():
+            any_token = True
+            yield (rec.get("label") or token[:8]), gate_payload(base, token)
+        if not any_token and not _is_host_only(cfg):
+            yield "QR", _qr_payload_url(cfg)
+
+    return Response(
+        stream_with_context(qr_sheet.iter_sheet_pdf(items(), cols=cols, rows=rows, error_correction=ec)),
+        mimetype="application/pdf",
+        headers={"Content-Disposition": 'inline; filename="qr-sheet.pdf"'},
+    )
+
+
 @app.get("/admin")
 def admin_get():
     cfg = load_config()
@@ -469,13 +1065,16 @@ def admin_post():
     if not _require_admin(cfg):
         return ("Yetkisiz.", 401)
 
-    cfg["qr_mode"] = request.form.get("qr_mode", cfg.get("qr_mode", "info_page"))
-    cfg["target_url"] = request.form.get("target_url", cfg.get("target_url", "")).strip()
-    cfg["append_run_id_to_target_url"] = bool(request.form.get("append_run_id_to_target_url"))
-    cfg["info_title"] = request.form.get("info_title", cfg.get("info_title", "Bilgiler"))
-    cfg["info_body"] = request.form.get("info_body", cfg.get("info_body", ""))
-
-    save_config(cfg)
+    update_config(
+        {
+            "qr_mode": request.form.get("qr_mode", cfg.get("qr_mode", "info_page")),
+            "target_url": request.form.get("target_url", cfg.get("target_url", "")).strip(),
+            "append_run_id_to_target_url": bool(request.form.get("append_run_id_to_target_url")),
+            "info_title": request.form.get("info_title", cfg.get("info_title", "Bilgiler")),
+            "info_body": request.form.get("info_body", cfg.get("info_body", "")),
+        }
+    )
+    qr_render.clear_cache()
     return redirect(url_for("admin_get", token=cfg.get("admin_token")))
 
 
@@ -484,30 +1083,24 @@ if __name__ == "__main__":
     print("RUN_ID:", RUN_ID)
     # Ensure we have a persistent token for the currently-active QR.
     _ = _get_active_qr_token(cfg)
-    # If desired, push the text to the hosted site so customers see it.
+    # If desired, push the text to the hosted site so customers see it, and sync the
+    # current token to the hosted gate (does not rotate unless token changed).
     try:
-        sync_info_to_remote(cfg)
-        if cfg.get("remote_sync_enabled"):
-            print("Remote sync: OK")
+        print_sync_outcome(cfg, sync_all_to_remote(cfg), None)
     except Exception as e:
-        if cfg.get("remote_sync_enabled"):
-            print("Remote sync: FAILED:", repr(e))
-
-    # Sync current token to hosted gate (does not rotate unless token changed).
-    try:
-        sync_rotate_to_remote(cfg)
-        if cfg.get("remote_rotate_enabled"):
-            print("Remote rotate: OK")
-    except Exception as e:
-        if cfg.get("remote_rotate_enabled"):
-            print("Remote rotate: FAILED:", repr(e))
-
-    _maybe_save_once(cfg)
-    if _LAST_SAVED_PATH:
-        print("QR PNG kaydedildi:", _LAST_SAVED_PATH)
-        print("QR içeriği:", _qr_payload_for_saved_png(cfg))
-    elif _LAST_SAVE_ERROR:
-        print("QR PNG kaydedilemedi:", _LAST_SAVE_ERROR)
+        print_sync_outcome(cfg, None, e)
+    # Keep retrying anything still queued (this run's failures or an earlier run's).
+    if sync_outbox.stats()["depth"]:
+        print("Bekleyen senkronizasyon:", sync_outbox.stats()["depth"], "(arka planda tekrar denenecek)")
+    sync_outbox.start()
+
+    _DESKTOP_SAVE.request(cfg)
+    save = _DESKTOP_SAVE.wait(timeout=30)
+    if save["state"] == "saved":
+        print("QR PNG kaydedildi:", save["path"])
+        print("QR içeriği:", qr_payload_for_saved_png(cfg))
+    elif save["state"] == "error":
+        print("QR PNG kaydedilemedi:", save["error"])
     print("Admin sayfası:")
     print(f"  http://127.0.0.1:8000/admin?token={cfg.get('admin_token')}")
     debug = os.getenv("FLASK_DEBUG", "").strip() == "1"
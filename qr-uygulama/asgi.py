@@ -0,0 +1,122 @@
+"""
+ASGI entry point (uvicorn asgi:app --workers 2).
+
+/r/<token>, /R/<token>, /info and /status are answered natively, so thousands of
+slow mobile connections wait on sockets instead of holding a sync worker each.
+They use the same logic as the Flask routes (gate_guard.check, info_http,
+status_payload). Answers held in memory (current token, negative cache, rendered
+/info) are sent straight from the event loop; anything that may touch the disk (a
+token lookup, a config reload, an /info render, /status reading sync_outbox.json)
+runs in the loop's default thread pool, so a slow disk never stalls other scans.
+Everything else (admin pages, /api/*, /qr.png) is handed to the Flask app through
+a WSGI adapter (a2wsgi, or asgiref), which runs it on a thread pool.
+
+Optional packages: uvicorn (server) and a2wsgi or asgiref (Flask mount).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+
+import gate_guard
+import metrics
+import scan_analytics
+from app import info_cached, info_http, status_payload, app as flask_app
+
+try:
+    from a2wsgi import WSGIMiddleware  # type: ignore
+
+    _flask_asgi = WSGIMiddleware(flask_app)
+except ModuleNotFoundError:  # pragma: no cover
+    try:
+        from asgiref.wsgi import WsgiToAsgi  # type: ignore
+
+        _flask_asgi = WsgiToAsgi(flask_app)
+    except ModuleNotFoundError:
+        _flask_asgi = None
+
+
+_MOUNT_MISSING = "Flask sayfaları için 'a2wsgi' paketi gerekli: pip install a2wsgi".encode("utf-8")
+
+
+def _headers(scope) -> dict:
+    # Only the few request headers the native routes read.
+    out = {}
+    for name, value in scope.get("headers") or ():
+        if name in (b"accept-encoding", b"if-none-match", b"user-agent", b"x-forwarded-for"):
+            out[name.decode("latin-1")] = value.decode("latin-1")
+    return out
+
+
+async def _respond(send, status: int, headers, body: bytes, head: bool) -> None:
+    raw = [(k.lower().encode("latin-1"), str(v).encode("latin-1")) for k, v in headers]
+    if status != 304:
+        raw.append((b"content-length", str(len(body)).encode("ascii")))
+    await send({"type": "http.response.start", "status": status, "headers": raw})
+    await send({"type": "http.response.body", "body": b"" if head else body})
+
+
+async def _gate(scope, send, token: str, head: bool) -> int:
+    h = _headers(scope)
+    answer = gate_guard.check_cached(token)
+    if answer is None:
+        # Token lookup (SQLite query, token-table or config reload): off the loop.
+        client = scope.get("client") or ("", 0)
+        ip = gate_guard.client_ip(client[0], h.get("x-forwarded-for", ""))
+        answer = await asyncio.get_running_loop().run_in_executor(None, gate_guard.check, token, ip)
+    code, value = answer
+    if code == 429:
+        headers = [("Content-Type", "text/plain; charset=utf-8"), ("Retry-After", gate_guard.RETRY_AFTER_S)]
+        await _respond(send, 429, headers, value.encode("utf-8"), head)
+        return code
+    scan_analytics.record(token, code == 302, h.get("user-agent", ""))
+    if code == 302:
+        headers = [("Location", value), ("Content-Type", "text/plain; charset=utf-8")]
+        await _respond(send, 302, headers, b"Redirecting...", head)
+    else:
+        await _respond(send, 410, [("Content-Type", "text/plain; charset=utf-8")], value.encode("utf-8"), head)
+    return code
+
+
+async def app(scope, receive, send) -> None:
+    if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+        path = scope["path"]
+        method = scope["method"]
+        head = method == "HEAD"
+        t0 = time.perf_counter()
+        # Route labels match the Flask rules (metrics.py).
+        if path[:3] in ("/r/", "/R/") and len(path) > 3 and "/" not in path[3:]:
+            code = await _gate(scope, send, path[3:], head)
+            metrics.observe_request(path[:3] + "<token>", method, code, time.perf_counter() - t0)
+            return
+        if path == "/info":
+            h = _headers(scope)
+            args = (h.get("accept-encoding", ""), h.get("if-none-match", ""))
+            if info_cached():
+                status, headers, body = info_http(*args)
+            else:
+                status, headers, body = await asyncio.get_running_loop().run_in_executor(None, info_http, *args)
+            await _respond(send, status, list(headers.items()), body, head)
+            metrics.observe_request("/info", method, status, time.perf_counter() - t0)
+            return
+        if path == "/status":
+            # Reads sync_outbox.json: always in the thread pool.
+            payload = await asyncio.get_running_loop().run_in_executor(None, status_payload)
+            body = json.dumps(payload).encode("utf-8")
+            await _respond(send, 200, [("Content-Type", "application/json")], body, head)
+            metrics.observe_request("/status", method, 200, time.perf_counter() - t0)
+            return
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if _flask_asgi is None:
+        await _respond(send, 501, [("Content-Type", "text/plain; charset=utf-8")], _MOUNT_MISSING, False)
+        return
+    await _flask_asgi(scope, receive, send)
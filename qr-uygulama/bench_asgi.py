@@ -0,0 +1,225 @@
+"""
+Burst scan load: gunicorn sync workers (wsgi.py) vs uvicorn (asgi.py), tail latency.
+
+Usage:
+  python bench_asgi.py [--concurrency 2000] [--requests 6000] [--slow-ms 200]
+                       [--stall-pct 1] [--stall-s 10] [--path /r/BENCHTOKEN]
+                       [--workers 2] [--url http://host:port]
+
+Starts each server locally on a throwaway config (skipped if not installed), then
+opens --concurrency connections at once; every virtual client sends one scan per
+connection (like a phone: new connection, request, close), dribbling the request
+headers over ~--slow-ms (slow mobile uplink), until --requests scans are done.
+Alongside, --stall-pct of the scans open an extra connection that sends half the
+headers and then goes silent for --stall-s (phone lost signal); those are not
+measured, they only occupy the server. Reports req/s and p50 / p90 / p99 / max latency (connect -> full response).
+With --url, only that already-running server is measured.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+
+try:
+    import resource
+except ImportError:  # pragma: no cover (Windows)
+    resource = None  # type: ignore[assignment]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_listening(port: int, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on :{port} did not start")
+
+
+async def _scan(host: str, port: int, path: str, slow_s: float, timeout: float) -> float | None:
+    t0 = time.perf_counter()
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        head = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n".encode("ascii")
+        tail = b"User-Agent: Mozilla/5.0 (iPhone) bench\r\nConnection: close\r\n\r\n"
+        writer.write(head)
+        if slow_s:
+            await asyncio.sleep(random.uniform(0.5, 1.5) * slow_s)
+        writer.write(tail)
+        await writer.drain()
+        data = await asyncio.wait_for(reader.read(), timeout)
+        if not data.startswith(b"HTTP/1.1 3") and not data.startswith(b"HTTP/1.1 2"):
+            return None
+        return time.perf_counter() - t0
+    except (OSError, asyncio.TimeoutError):
+        return None
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def _stall(host: str, port: int, path: str, stall_s: float) -> None:
+    # A phone that loses signal mid-request: half the headers, then nothing until
+    # it gives up. A sync worker that accepted it is blocked for the whole time.
+    writer = None
+    try:
+        _, writer = await asyncio.open_connection(host, port)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n".encode("ascii"))
+        await writer.drain()
+        await asyncio.sleep(stall_s)
+    except OSError:
+        pass
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def _load(url: str, concurrency: int, requests: int, slow_s: float, stall_pct: float,
+                stall_s: float, timeout: float):
+    parts = urllib.parse.urlsplit(url)
+    host, port, path = parts.hostname, parts.port or 80, parts.path or "/"
+    latencies: list[float] = []
+    errors = 0
+    remaining = requests
+    stalls: list[asyncio.Task] = []
+
+    async def client() -> None:
+        nonlocal remaining, errors
+        await asyncio.sleep(random.uniform(0, max(slow_s, 0.05)))  # staggered arrivals
+        while remaining > 0:
+            remaining -= 1
+            if random.random() * 100 < stall_pct:
+                stalls.append(asyncio.create_task(_stall(host, port, path, stall_s)))
+            result = await _scan(host, port, path, slow_s, timeout)
+            if result is None:
+                errors += 1
+            else:
+                latencies.append(result)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    for task in stalls:
+        task.cancel()
+    await asyncio.gather(*stalls, return_exceptions=True)
+    return latencies, errors, elapsed
+
+
+def _pct(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))] * 1000
+
+
+def _report(name: str, latencies: list[float], errors: int, elapsed: float) -> None:
+    lat = sorted(latencies)
+    print(
+        f"{name:<20} {len(lat) / elapsed:8.0f} {_pct(lat, 50):8.0f} {_pct(lat, 90):8.0f} "
+        f"{_pct(lat, 99):8.0f} {(lat[-1] * 1000 if lat else float('nan')):8.0f} {errors:7d}"
+    )
+
+
+def _servers(workers: int, port: int) -> dict[str, list[str]]:
+    servers = {}
+    if _has("gunicorn"):
+        servers["gunicorn (wsgi)"] = [
+            sys.executable, "-m", "gunicorn", "-w", str(workers), "-b", f"127.0.0.1:{port}",
+            "--backlog", "4096", "--log-level", "warning", "wsgi:app",
+        ]
+    if _has("uvicorn"):
+        servers["uvicorn (asgi)"] = [
+            sys.executable, "-m", "uvicorn", "asgi:app", "--workers", str(workers),
+            "--host", "127.0.0.1", "--port", str(port), "--backlog", "4096",
+            "--log-level", "warning", "--no-access-log",
+        ]
+    return servers
+
+
+def _has(module: str) -> bool:
+    import importlib.util
+
+    return importlib.util.find_spec(module) is not None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=6000)
+    parser.add_argument("--slow-ms", type=float, default=200.0)
+    parser.add_argument("--path", default="/r/BENCHTOKEN")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--stall-pct", type=float, default=1.0, help="kopan bağlantı oranı (%%)")
+    parser.add_argument("--stall-s", type=float, default=10.0)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--url", default=None)
+    args = parser.parse_args()
+
+    if resource is not None:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        want = min(hard, max(soft, args.concurrency * 2 + 256))
+        resource.setrlimit(resource.RLIMIT_NOFILE, (want, hard))
+
+    print(
+        f"concurrency {args.concurrency}, {args.requests} scans, request headers spread over ~{args.slow_ms:.0f} ms, "
+        f"{args.stall_pct:g}% extra connections stalled for {args.stall_s:g} s"
+    )
+    print(f"{'server':<20} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+
+    def run(url: str, warmup: bool = False):
+        if warmup:
+            return asyncio.run(_load(url, 20, 200, 0.0, 0.0, 0.0, args.timeout))
+        return asyncio.run(
+            _load(url, args.concurrency, args.requests, args.slow_ms / 1000, args.stall_pct, args.stall_s, args.timeout)
+        )
+
+    if args.url:
+        _report(args.url, *run(args.url.rstrip("/") + args.path))
+        return 0
+
+    tmp = tempfile.mkdtemp(prefix="bench-asgi-")
+    env = {
+        **os.environ,
+        "QR_CONFIG_PATH": os.path.join(tmp, "config.json"),
+        "QR_SCAN_LOG_PATH": os.path.join(tmp, "scans.log"),
+        "APP_MODE": "host_only",
+    }
+    os.environ.update(env)
+    import config_store
+
+    config_store.update_config({"current_qr_token": "BENCHTOKEN", "static_redirect_url": "https://example.com"})
+    port = _free_port()
+    servers = _servers(args.workers, port)
+    if not servers:
+        print("gunicorn / uvicorn kurulu değil.")
+        return 1
+    for name, cmd in servers.items():
+        proc = subprocess.Popen(cmd, cwd=os.path.dirname(os.path.abspath(__file__)), env=env)
+        try:
+            _wait_listening(port)
+            run(f"http://127.0.0.1:{port}{args.path}", warmup=True)  # imports, caches
+            _report(name, *run(f"http://127.0.0.1:{port}{args.path}"))
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
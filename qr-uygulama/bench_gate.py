@@ -0,0 +1,85 @@
+"""
+Gate throughput: Flask route vs the QR_FAST_GATE pre-dispatch layer (wsgi.py).
+
+Usage:
+  python bench_gate.py [--requests N]
+
+Calls each WSGI app in-process (no sockets), so the numbers isolate per-request
+framework cost: routing, request context, ProxyFix, config lookup, response build.
+Uses a throwaway config (QR_CONFIG_PATH in a temp dir).
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+
+def _environ(path: str) -> dict:
+    return {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": path,
+        "QUERY_STRING": "",
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "8000",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": "localhost:8000",
+        "HTTP_USER_AGENT": "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X)",
+        "REMOTE_ADDR": "127.0.0.1",
+        "wsgi.url_scheme": "http",
+        "wsgi.input": io.BytesIO(b""),
+        "wsgi.errors": sys.stderr,
+        "wsgi.version": (1, 0),
+        "wsgi.multithread": False,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+
+
+def _run(app, path: str, n: int) -> float:
+    def start_response(status, headers, exc_info=None):
+        return None
+
+    for _ in range(200):
+        b"".join(app(_environ(path), start_response))
+    t0 = time.perf_counter()
+    for _ in range(n):
+        result = app(_environ(path), start_response)
+        b"".join(result)
+        close = getattr(result, "close", None)
+        if close:
+            close()
+    return n / (time.perf_counter() - t0)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-gate-")
+    os.environ["QR_CONFIG_PATH"] = os.path.join(tmp, "config.json")
+    os.environ["QR_SCAN_LOG_PATH"] = os.path.join(tmp, "scans.log")
+
+    import config_store
+    import wsgi
+
+    config_store.update_config({"current_qr_token": "BENCHTOKEN", "static_redirect_url": "https://example.com"})
+    flask_app = wsgi.flask_app
+    fast_app = wsgi.GateFastPath(flask_app)
+
+    print(f"requests per case: {args.requests}")
+    print(f"{'case':<16} {'flask req/s':>12} {'fast req/s':>12} {'speedup':>8}")
+    for name, path in (("/r/ hit (302)", "/r/BENCHTOKEN"), ("/r/ old (410)", "/r/OLDTOKEN"), ("/status", "/status")):
+        slow = _run(flask_app, path, args.requests)
+        fast = _run(fast_app, path, args.requests)
+        print(f"{name:<16} {slow:>12.0f} {fast:>12.0f} {fast / slow:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,78 @@
+"""
+Benchmark: legacy qrcode+PIL PNG pipeline vs qr_render (memoized matrix + direct PNG).
+
+Usage:
+  python bench_qr.py [--repeat N]
+
+For each payload length it reports ms per image for:
+- legacy:      QRCode(...).make(fit=True) + make_image() + PIL PNG save (what /qr.png used to do)
+- engine cold: matrix computation + rasterize + encode (matrix cache cleared every time)
+- engine warm: rasterize + encode only, at a different box size (matrix already memoized)
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import time
+
+import qrcode
+
+import qr_render
+
+
+PAYLOAD_LENGTHS = (24, 64, 128, 256, 512)
+
+
+def _legacy_png(payload: str, box_size: int) -> bytes:
+    qr = qrcode.QRCode(
+        version=None,
+        error_correction=qrcode.constants.ERROR_CORRECT_M,
+        box_size=box_size,
+        border=4,
+    )
+    qr.add_data(payload)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _engine_cold(payload: str, box_size: int) -> bytes:
+    qr_render.qr_matrix.cache_clear()
+    return qr_render.rasterize_png(qr_render.qr_matrix(payload, "M"), box_size, 4)
+
+
+def _engine_warm(payload: str, box_size: int) -> bytes:
+    return qr_render.rasterize_png(qr_render.qr_matrix(payload, "M"), box_size, 4)
+
+
+def _time_ms(fn, payload: str, box_size: int, repeat: int) -> float:
+    fn(payload, box_size)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(payload, box_size)
+    return (time.perf_counter() - t0) * 1000.0 / repeat
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rasterizer = "numpy" if qr_render.has_numpy() else "pure-python"
+    print(f"rasterizer: {rasterizer}, repeat: {args.repeat}")
+    print(f"{'len':>5} {'version':>7} {'legacy ms':>10} {'cold ms':>9} {'warm ms':>9} {'speedup':>8}")
+    for n in PAYLOAD_LENGTHS:
+        payload = ("https://example.onrender.com/r/" + "x" * n)[:n]
+        version = (len(qr_render.qr_matrix(payload, "M")) - 17) // 4
+        legacy = _time_ms(_legacy_png, payload, 10, args.repeat)
+        cold = _time_ms(_engine_cold, payload, 10, args.repeat)
+        warm = _time_ms(_engine_warm, payload, 6, args.repeat)
+        print(f"{n:>5} {version:>7} {legacy:>10.2f} {cold:>9.2f} {warm:>9.2f} {legacy / cold:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,137 @@
+"""
+Cold-start cost per app mode: import time (-X importtime), first request, RSS.
+
+Usage:
+  python bench_startup.py [--runs N] [--top N] [--max-import-ms MS] [--max-rss-mb MB]
+
+Each run is a fresh interpreter that imports wsgi (what a gunicorn worker does),
+then serves the first request typical for the mode through the WSGI app:
+- host_only: GET /info (customer-facing host)
+- full:      GET /qr.png (local app; pays the lazy qrcode/PIL/NumPy import here)
+Reported per mode: median import time of `wsgi`, first request, wall-clock of the
+whole process, RSS after the first request, and the slowest imports.
+--max-import-ms / --max-rss-mb make the script exit 1 when host_only exceeds them
+(for CI / before deploying). Uses a throwaway config (QR_CONFIG_PATH in a temp dir).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+MODES = {"host_only": "/info", "full": "/qr.png"}
+
+_CHILD = r"""
+import io, json, sys, time
+t0 = time.perf_counter()
+import wsgi
+t1 = time.perf_counter()
+environ = {
+    "REQUEST_METHOD": "GET", "PATH_INFO": sys.argv[1], "QUERY_STRING": "",
+    "SERVER_NAME": "localhost", "SERVER_PORT": "8000", "SERVER_PROTOCOL": "HTTP/1.1",
+    "HTTP_HOST": "localhost:8000", "REMOTE_ADDR": "127.0.0.1", "wsgi.url_scheme": "http",
+    "wsgi.input": io.BytesIO(b""), "wsgi.errors": sys.stderr, "wsgi.version": (1, 0),
+    "wsgi.multithread": False, "wsgi.multiprocess": True, "wsgi.run_once": False,
+}
+status = []
+b"".join(wsgi.app(environ, lambda s, h, e=None: status.append(s)))
+t2 = time.perf_counter()
+rss_kb = None
+try:
+    with open("/proc/self/status") as f:
+        rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+except (OSError, StopIteration):
+    try:
+        import resource
+        rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == "darwin":
+            rss_kb //= 1024
+    except ImportError:
+        pass
+heavy = [m for m in ("qrcode", "PIL", "numpy") if m in sys.modules]
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "request_ms": (t2 - t1) * 1000,
+                  "status": status[0], "rss_kb": rss_kb, "heavy": heavy}))
+"""
+
+
+def _parse_importtime(stderr: str) -> dict[str, int]:
+    """
+    {module: cumulative microseconds} from -X importtime output.
+    """
+    out = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|", 1).split("|"))
+        out[name.strip()] = int(cumulative_us)
+    return out
+
+
+def _run_once(mode: str, path: str, env: dict) -> tuple[dict, dict[str, int], float]:
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD, path],
+        env={**env, "APP_MODE": mode},
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall_ms = (time.perf_counter() - t0) * 1000
+    return json.loads(proc.stdout.strip().splitlines()[-1]), _parse_importtime(proc.stderr), wall_ms
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="en yavaş N import'u göster")
+    parser.add_argument("--max-import-ms", type=float, default=None)
+    parser.add_argument("--max-rss-mb", type=float, default=None)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-startup-")
+    env = {**os.environ, "QR_CONFIG_PATH": os.path.join(tmp, "config.json"), "QR_SCAN_ANALYTICS": "0"}
+    env.pop("QR_FAST_GATE", None)
+
+    failed = False
+    print(f"runs: {args.runs} (median), python {sys.version.split()[0]}")
+    for mode, path in MODES.items():
+        _run_once(mode, path, env)  # warm the OS page cache / __pycache__
+        samples = [_run_once(mode, path, env) for _ in range(max(1, args.runs))]
+        import_ms = statistics.median(s[1].get("wsgi", 0) / 1000 for s in samples)
+        request_ms = statistics.median(s[0]["request_ms"] for s in samples)
+        wall_ms = statistics.median(s[2] for s in samples)
+        rss = [s[0]["rss_kb"] for s in samples if s[0]["rss_kb"]]
+        rss_mb = statistics.median(rss) / 1024 if rss else None
+        first = samples[0][0]
+        print(f"\n[{mode}] GET {path} -> {first['status']}")
+        print(f"  import wsgi     {import_ms:8.1f} ms")
+        print(f"  first request   {request_ms:8.1f} ms")
+        print(f"  process wall    {wall_ms:8.1f} ms")
+        print(f"  RSS             {rss_mb:8.1f} MB" if rss_mb is not None else "  RSS                  n/a")
+        print(f"  qrcode/PIL/numpy loaded: {', '.join(first['heavy']) or 'no'}")
+        slowest = sorted(samples[0][1].items(), key=lambda kv: kv[1], reverse=True)
+        top = [(name, us) for name, us in slowest if name != "wsgi"][: args.top]
+        print("  slowest imports (cumulative):")
+        for name, us in top:
+            print(f"    {us / 1000:8.1f} ms  {name}")
+
+        if mode == "host_only":
+            if args.max_import_ms is not None and import_ms > args.max_import_ms:
+                print(f"  FAIL: import {import_ms:.1f} ms > {args.max_import_ms:.1f} ms")
+                failed = True
+            if args.max_rss_mb is not None and rss_mb is not None and rss_mb > args.max_rss_mb:
+                print(f"  FAIL: RSS {rss_mb:.1f} MB > {args.max_rss_mb:.1f} MB")
+                failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,131 @@
+"""
+Remote sync wall-clock: legacy urllib calls vs the keep-alive SyncClient + /api/sync.
+
+Usage:
+  python bench_sync.py [--runs N] [--connect-ms 150] [--rtt-ms 60]
+
+Starts a local stand-in for the hosted app. It delays each *new connection* by
+--connect-ms (standing in for TCP + TLS handshake to Render) and each request by
+--rtt-ms. Measured per run:
+- legacy:        /api/config then /api/rotate, one urllib connection each (old code)
+- client (cold): sync_all_to_remote() in a fresh process state (one connection, one request)
+- client (warm): sync_all_to_remote() again on the kept-alive connection
+- unchanged:     sync_all_to_remote() when the host already acknowledged this state
+The client rows pass force=True so they measure the request, not the content-hash skip.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _make_handler(connect_s: float, rtt_s: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in separate writes; without this, Nagle + delayed ACK
+        # would add ~40 ms per request that the real host does not have.
+        disable_nagle_algorithm = True
+
+        def setup(self) -> None:
+            time.sleep(connect_s)
+            super().setup()
+
+        def do_POST(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            self.rfile.read(length)
+            time.sleep(rtt_s)
+            body = b'{"ok": true}'
+            if self.path not in ("/api/sync", "/api/config", "/api/rotate"):
+                self.send_response(404)
+                body = b'{"ok": false}'
+            else:
+                self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    return Handler
+
+
+def _legacy_post(url: str, token: str, payload: dict) -> None:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    req = urllib.request.Request(
+        url,
+        data=body,
+        headers={"Content-Type": "application/json; charset=utf-8", "Authorization": f"Bearer {token}"},
+        method="POST",
+    )
+    with urllib.request.urlopen(req, timeout=15) as resp:
+        _ = resp.read()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--connect-ms", type=float, default=150.0)
+    parser.add_argument("--rtt-ms", type=float, default=60.0)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-sync-")
+    os.environ["QR_CONFIG_PATH"] = os.path.join(tmp, "config.json")
+
+    import app
+    import sync_client
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(args.connect_ms / 1000, args.rtt_ms / 1000))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    cfg = app.load_config()
+    cfg.update(
+        {
+            "remote_sync_enabled": True,
+            "remote_rotate_enabled": True,
+            "remote_base_url": base,
+            "remote_admin_token": "bench",
+            "active_qr_token": "BENCHTOKEN",
+        }
+    )
+
+    def legacy() -> None:
+        _legacy_post(base + "/api/config", "bench", app.info_payload(cfg))
+        _legacy_post(base + "/api/rotate", "bench", app.rotate_payload(cfg))
+
+    def client_cold() -> None:
+        sync_client.close_all()
+        app.sync_all_to_remote(cfg, force=True)
+
+    def client_warm() -> None:
+        app.sync_all_to_remote(cfg, force=True)
+
+    def unchanged() -> None:
+        app.sync_all_to_remote(cfg)
+
+    print(f"stand-in host: connect +{args.connect_ms:.0f} ms, request +{args.rtt_ms:.0f} ms, runs: {args.runs}")
+    results = {}
+    for name, fn in (("legacy", legacy), ("client (cold)", client_cold), ("client (warm)", client_warm), ("unchanged", unchanged)):
+        fn()
+        t0 = time.perf_counter()
+        for _ in range(args.runs):
+            fn()
+        results[name] = (time.perf_counter() - t0) * 1000 / args.runs
+    for name, ms in results.items():
+        print(f"{name:<14} {ms:8.1f} ms/run  ({results['legacy'] / ms:.1f}x)")
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
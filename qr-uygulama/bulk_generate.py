@@ -0,0 +1,234 @@
+"""
+Bulk QR generation for fleet rollouts.
+
+Usage:
+  python bulk_generate.py tokens.csv [--out bulk_output] [--workers N]
+                          [--format png|svg] [--ec L|M|Q|H] [--box-size N] [--border N]
+                          [--ttl-seconds N] [--upload]
+
+tokens.csv columns: label, redirect_url (header row optional; an optional third
+"token" column pins a specific token).
+
+- Tokens are minted like the single-QR flow (token_urlsafe(18), or uppercase base36
+  when qr_payload_mode is "compact"), and
+  reused by label from an existing manifest so re-runs keep printed codes valid.
+- Images are rendered across a ProcessPoolExecutor into a content-addressed store
+  (objects/<2 hex>/<sha256 of render inputs>.<ext>); images already present are skipped.
+- manifest.json is shaped for POST /api/tokens ({"tokens": [...]}); --upload sends the
+  tokens not uploaded yet (minted in this run, or left over from a failed upload) to
+  every host in remote_base_url in chunks. Tokens reused from an earlier upload are
+  never re-sent, so codes revoked on the host stay revoked.
+- --ttl-seconds sets expires_at on tokens minted in this run only; reused tokens keep
+  the expires_at from the manifest, which matches what the host stored.
+- manifest.jsonl holds the same token entries, one JSON object per line, for readers
+  that stream them (print_sheet.py).
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import qr_render
+import sync_client
+from app import gate_payload, new_qr_token, saved_gate_base
+from config_store import load_config
+
+
+UPLOAD_CHUNK = 5000
+# A chunk of thousands of tokens is one SQLite transaction on the host.
+UPLOAD_TIMEOUT_S = 60.0
+
+
+def _read_rows(csv_path: Path) -> list[dict]:
+    rows = []
+    with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+        for i, rec in enumerate(csv.reader(f)):
+            if not rec or not any(c.strip() for c in rec):
+                continue
+            if i == 0 and rec[0].strip().lower() == "label":
+                continue
+            label = rec[0].strip()
+            url = rec[1].strip() if len(rec) > 1 else ""
+            token = rec[2].strip() if len(rec) > 2 else ""
+            rows.append({"label": label, "redirect_url": url, "token": token})
+    return rows
+
+
+def _object_name(payload: str, fmt: str, ec: str, box_size: int, border: int) -> str:
+    # Render output is a pure function of these inputs, so they address the object.
+    key = "\0".join([fmt, ec, str(box_size), str(border), payload]).encode("utf-8")
+    digest = hashlib.sha256(key).hexdigest()
+    return f"objects/{digest[:2]}/{digest}.{fmt}"
+
+
+def _render_job(job: tuple) -> float:
+    """
+    Runs in a worker process. Returns render+write time in ms.
+    """
+    payload, fmt, ec, box_size, border, out_path = job
+    t0 = time.perf_counter()
+    data, _ = qr_render.render(payload, fmt, ec, box_size, border)
+    path = Path(out_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return (time.perf_counter() - t0) * 1000.0
+
+
+def _upload(cfg: dict, tokens: list[dict]) -> None:
+    chunks = [
+        [
+            {k: t[k] for k in ("token", "redirect_url", "label", "expires_at") if t.get(k) is not None}
+            for t in tokens[i : i + UPLOAD_CHUNK]
+        ]
+        for i in range(0, len(tokens), UPLOAD_CHUNK)
+    ]
+
+    def push(client: sync_client.SyncClient) -> None:
+        for chunk in chunks:
+            client.post_json("/api/tokens", {"tokens": chunk})
+
+    clients = [
+        sync_client.get_client(c.base_url, c.admin_token, max(c.timeout, UPLOAD_TIMEOUT_S))
+        for c in sync_client.clients_for_config(cfg)
+    ]
+    results = sync_client.fan_out(clients, push, sync_client.retries_for_config(cfg))
+    for line in sync_client.format_report(results):
+        print("upload:", line)
+    if not all(r["ok"] for r in results):
+        raise sync_client.FanOutError(results)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="CSV'den toplu QR üretimi")
+    parser.add_argument("csv", type=Path)
+    parser.add_argument("--out", type=Path, default=Path("bulk_output"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--format", choices=["png", "svg"], default=None)
+    parser.add_argument("--ec", choices=["L", "M", "Q", "H"], default=None)
+    parser.add_argument("--box-size", type=int, default=None)
+    parser.add_argument("--border", type=int, default=None)
+    parser.add_argument("--ttl-seconds", type=int, default=None, help="token ömrü (boşsa süresiz)")
+    parser.add_argument("--upload", action="store_true", help="manifest'i host'a /api/tokens ile gönder")
+    args = parser.parse_args(argv)
+
+    cfg = load_config()
+    fmt, ec, box_size, border = qr_render.normalize_options(
+        args.format or cfg.get("qr_output_format"),
+        args.ec or cfg.get("qr_error_correction"),
+        args.box_size if args.box_size is not None else cfg.get("qr_box_size"),
+        args.border if args.border is not None else cfg.get("qr_border"),
+    )
+    base = saved_gate_base(cfg)
+    timings: dict[str, float] = {}
+
+    t0 = time.perf_counter()
+    rows = _read_rows(args.csv)
+    labels = [r["label"] for r in rows]
+    if len(set(labels)) != len(labels):
+        print("Hata: CSV'de tekrar eden label var (label benzersiz olmalı).")
+        return 1
+    timings["read_csv"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    manifest_path = args.out / "manifest.json"
+    previous: dict[str, dict] = {}
+    if manifest_path.exists():
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            previous = {t["label"]: t for t in json.load(f).get("tokens", [])}
+    expires_at = int(time.time()) + args.ttl_seconds if args.ttl_seconds else None
+    entries = []
+    for row in rows:
+        prev = previous.get(row["label"])
+        token = row["token"] or (prev["token"] if prev else "") or new_qr_token(cfg)
+        reused = prev is not None and prev["token"] == token
+        # Manifests written before the "uploaded" flag existed: reused tokens count as uploaded.
+        uploaded = reused and prev.get("uploaded", True)
+        payload = gate_payload(base, token)
+        entries.append(
+            {
+                "label": row["label"],
+                "token": token,
+                "redirect_url": row["redirect_url"],
+                # --ttl-seconds applies to tokens minted now; a reused token keeps the
+                # expiry it was uploaded with.
+                "expires_at": prev.get("expires_at") if reused else expires_at,
+                "payload": payload,
+                "image": _object_name(payload, fmt, ec, box_size, border),
+                "uploaded": uploaded,
+            }
+        )
+    timings["mint"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    jobs = [
+        (e["payload"], fmt, ec, box_size, border, str(args.out / e["image"]))
+        for e in entries
+        if not (args.out / e["image"]).exists()
+    ]
+    skipped = len(entries) - len(jobs)
+    render_ms = 0.0
+    if jobs:
+        workers = max(1, args.workers)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(jobs) // (workers * 8))
+            for ms in pool.map(_render_job, jobs, chunksize=chunksize):
+                render_ms += ms
+    timings["render"] = time.perf_counter() - t0
+
+    if args.upload:
+        t0 = time.perf_counter()
+        pending = [e for e in entries if not e["uploaded"]]
+        try:
+            if pending:
+                _upload(cfg, pending)
+            for entry in pending:
+                entry["uploaded"] = True
+            print(f"Host'a yükleme: OK ({len(pending)} yeni token, {len(entries) - len(pending)} zaten yüklüydü)")
+        except Exception as e:
+            print("Host'a yükleme: FAILED:", repr(e))
+        timings["upload"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    args.out.mkdir(parents=True, exist_ok=True)
+    tmp = manifest_path.with_suffix(".json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(
+            {"base_url": base, "format": fmt, "ec": ec, "box_size": box_size, "border": border, "tokens": entries},
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+        f.write("\n")
+    lines_path = manifest_path.with_suffix(".jsonl")
+    lines_tmp = lines_path.with_suffix(".jsonl.tmp")
+    with open(lines_tmp, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    os.replace(tmp, manifest_path)
+    os.replace(lines_tmp, lines_path)
+    timings["manifest"] = time.perf_counter() - t0
+
+    rendered = len(jobs)
+    total = sum(timings.values())
+    print(f"QR: {len(entries)} toplam, {rendered} üretildi, {skipped} atlandı (zaten vardı)")
+    if rendered:
+        print(f"Hız: {rendered / timings['render']:.1f} QR/s (render), ort. {render_ms / rendered:.2f} ms/QR (worker)")
+    for stage, secs in timings.items():
+        print(f"  {stage:<9} {secs * 1000:9.1f} ms")
+    print(f"  {'toplam':<9} {total * 1000:9.1f} ms")
+    print("Manifest:", manifest_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
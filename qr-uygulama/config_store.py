@@ -1,7 +1,23 @@
 import json
+import mmap
 import os
 import secrets
-from typing import Any, Dict
+import sqlite3
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+import metrics
+import procutil
+
+try:
+    import fcntl
+except ModuleNotFoundError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+    import msvcrt
 
 
 DEFAULT_CONFIG: Dict[str, Any] = {
@@ -14,10 +30,21 @@ DEFAULT_CONFIG: Dict[str, Any] = {
     "public_base_url": "",  # e.g. "https://your-app.onrender.com" (used for saving qr.png without request context)
     "qr_save_to_desktop": True,
     "qr_output_filename": "qr.png",
+    # saved QR image options: "png" | "svg", error correction L/M/Q/H, pixels per module, quiet-zone modules
+    "qr_output_format": "png",
+    "qr_error_correction": "M",
+    "qr_box_size": 10,
+    "qr_border": 4,
+    # "default": .../r/<token_urlsafe>  |  "compact": HTTPS://HOST/R/<BASE36> (QR alphanumeric mode, smaller QR)
+    "qr_payload_mode": "default",
     # Local -> Remote sync (müşterilerin göreceği host)
     "remote_sync_enabled": False,
-    "remote_base_url": "",  # e.g. "https://your-app.onrender.com"
+    # e.g. "https://your-app.onrender.com", or a list of replicas:
+    # ["https://a.onrender.com", {"url": "https://b.example", "admin_token": "...", "timeout_s": 5}]
+    "remote_base_url": "",
     "remote_admin_token": "",  # Render'daki ADMIN_TOKEN ile aynı
+    "remote_timeout_s": 15,
+    "remote_retries": 3,  # per host, jittered exponential backoff
     # QR rotation / redirect gate (invalidate old QR)
     "remote_rotate_enabled": False,
     "static_redirect_url": "https://statik-qr-website.onrender.com",
@@ -33,7 +60,7 @@ DEFAULT_CONFIG: Dict[str, Any] = {
 }
 
 
-def _config_path() -> str:
+def config_path() -> str:
     env_path = (os.getenv("QR_CONFIG_PATH") or "").strip()
     if env_path:
         return env_path
@@ -41,39 +68,706 @@ def _config_path() -> str:
     return os.path.join(here, "config.json")
 
 
-def load_config() -> Dict[str, Any]:
-    path = _config_path()
+def config_db_path() -> str:
+    env_path = (os.getenv("QR_CONFIG_DB_PATH") or "").strip()
+    if env_path:
+        return env_path
+    root, _ = os.path.splitext(config_path())
+    return root + ".db"
+
+
+def _backend_name() -> str:
+    return (os.getenv("QR_CONFIG_BACKEND") or "json").strip().lower()
+
+
+# Cross-process write lock (<path>.lock) + per-thread reentrancy, so a
+# read-modify-write can call save_config() without deadlocking on itself.
+# Locks and re-entry counts are per path: holding file_lock(A) never makes
+# file_lock(B) a no-op.
+_PATH_LOCKS: Dict[str, threading.Lock] = {}
+_PATH_LOCKS_GUARD = threading.Lock()
+_LOCAL = threading.local()
+
+
+def _lock_file(fh) -> None:
+    if fcntl is not None:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+    else:  # pragma: no cover - Windows
+        fh.seek(0)
+        while True:
+            try:
+                msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                time.sleep(0.05)
+
+
+def _unlock_file(fh) -> None:
+    if fcntl is not None:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+    else:  # pragma: no cover - Windows
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """
+    Exclusive lock for JSON writers (threads and gunicorn workers alike).
+    Readers never take it: writes are atomic renames, so they always see a whole file.
+    """
+    key = os.path.abspath(path)
+    held = getattr(_LOCAL, "held", None)
+    if held is None:
+        held = _LOCAL.held = {}
+    if held.get(key):
+        held[key] += 1
+        try:
+            yield
+        finally:
+            held[key] -= 1
+        return
+
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    with _PATH_LOCKS_GUARD:
+        lock = _PATH_LOCKS.setdefault(key, threading.Lock())
+    with lock:
+        with open(path + ".lock", "a+b") as fh:
+            _lock_file(fh)
+            held[key] = 1
+            try:
+                yield
+            finally:
+                del held[key]
+                _unlock_file(fh)
+
+
+def write_json_atomic(path: str, data: Any) -> None:
+    text = json.dumps(data, ensure_ascii=False, indent=2) + "\n"
+    procutil.write_atomic(path, text.encode("utf-8"), durable=True)
+
+
+# How long a process may trust the shared generation counter alone before it
+# re-checks the storage signature (catches edits made outside the app, e.g. by hand).
+SIGNATURE_RECHECK_S = 1.0
+
+
+class _Generation:
+    """
+    Write counter shared by every process through a memory-mapped 8-byte file
+    (<storage>.gen). Writers bump() or publish() it after each committed write;
+    readers compare it against the value their in-memory copy was loaded at, with no syscall.
+    Mapped lazily per process, so it is safe with gunicorn --preload and recycled workers.
+    """
+
+    _FMT = struct.Struct("<Q")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._mm: Optional[mmap.mmap] = None
+        self._pid: Optional[int] = None
+
+    def _map(self) -> Optional[mmap.mmap]:
+        if self._mm is not None and self._pid == os.getpid():
+            return self._mm
+        try:
+            parent = os.path.dirname(self.path)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if os.fstat(fd).st_size < self._FMT.size:
+                    os.ftruncate(fd, self._FMT.size)
+                mm = mmap.mmap(fd, self._FMT.size)
+            finally:
+                os.close(fd)
+        except (OSError, ValueError):
+            # No shared counter (e.g. read-only disk): callers fall back to signatures.
+            return None
+        self._mm, self._pid = mm, os.getpid()
+        return mm
+
+    def value(self) -> Optional[int]:
+        mm = self._map()
+        return None if mm is None else self._FMT.unpack_from(mm, 0)[0]
+
+    def bump(self) -> None:
+        # Called after the write is committed, so a reader that sees the new value
+        # also sees the new data. The read-modify-write is not atomic: callers hold
+        # the storage write lock (JSON backend).
+        mm = self._map()
+        if mm is not None:
+            self._FMT.pack_into(mm, 0, (self._FMT.unpack_from(mm, 0)[0] + 1) & 0xFFFFFFFFFFFFFFFF)
+
+    def publish(self, committed: int) -> None:
+        """
+        Stores a generation committed by the storage itself (SQLite meta.generation),
+        unless a later one is already there: writers that finish out of order never
+        move the counter back.
+        """
+        mm = self._map()
+        if mm is None:
+            return
+        with file_lock(self.path):
+            if committed > self._FMT.unpack_from(mm, 0)[0]:
+                self._FMT.pack_into(mm, 0, committed & 0xFFFFFFFFFFFFFFFF)
+
+
+class JsonBackend:
+    """
+    Whole config in one JSON document (default; config.json / QR_CONFIG_PATH).
+    The QR token table lives next to it (config_tokens.json), held in memory as a dict.
+    """
+
+    name = "json"
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.tokens_path = os.path.splitext(path)[0] + "_tokens.json"
+        self.generation = _Generation(path + ".gen")
+        self._tokens: Dict[str, Dict[str, Any]] = {}
+        self._tokens_sig: Optional[Tuple[int, int, int]] = None
+        self._tokens_gen: Optional[int] = None
+        self._tokens_checked = 0.0
+
+    def signature(self) -> Optional[Tuple[Any, ...]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def read(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        return data if isinstance(data, dict) else {}
+
+    def write_all(self, cfg: Dict[str, Any]) -> None:
+        with file_lock(self.path):
+            write_json_atomic(self.path, cfg)
+            self.generation.bump()
+
+    def update(self, changes: Mapping[str, Any]) -> None:
+        with file_lock(self.path):
+            # Re-read from disk under the lock: another worker may have written since.
+            cfg = self.read() or {}
+            cfg.update(changes)
+            write_json_atomic(self.path, cfg)
+            self.generation.bump()
+
+    def _token_table(self) -> Dict[str, Dict[str, Any]]:
+        gen = self.generation.value()
+        now = time.monotonic()
+        if gen is not None and gen == self._tokens_gen and now - self._tokens_checked < SIGNATURE_RECHECK_S:
+            return self._tokens
+        try:
+            st = os.stat(self.tokens_path)
+        except OSError:
+            self._tokens, self._tokens_sig = {}, None
+            self._tokens_gen, self._tokens_checked = gen, now
+            return self._tokens
+        sig = (st.st_mtime_ns, st.st_size, st.st_ino)
+        if sig != self._tokens_sig:
+            with open(self.tokens_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._tokens = data if isinstance(data, dict) else {}
+            self._tokens_sig = sig
+        self._tokens_gen, self._tokens_checked = gen, now
+        return self._tokens
+
+    def get_token(self, token: str) -> Optional[Dict[str, Any]]:
+        return self._token_table().get(token)
+
+    def iter_tokens(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        return iter(list(self._token_table().items()))
+
+    def put_tokens(self, records: List[Dict[str, Any]]) -> None:
+        with file_lock(self.path):
+            table = dict(self._token_table())
+            for rec in records:
+                new = {k: v for k, v in rec.items() if k != "token"}
+                old = table.get(rec["token"])
+                if old is not None:
+                    # Upsert: a re-sent token keeps its created_at and stays revoked.
+                    new["created_at"] = old.get("created_at", new.get("created_at"))
+                    new["revoked"] = bool(old.get("revoked")) or bool(new.get("revoked"))
+                table[rec["token"]] = new
+            write_json_atomic(self.tokens_path, table)
+            self.generation.bump()
+
+    def revoke_tokens(self, tokens: List[str]) -> int:
+        with file_lock(self.path):
+            table = dict(self._token_table())
+            n = 0
+            for t in tokens:
+                rec = table.get(t)
+                if rec is not None and not rec.get("revoked"):
+                    table[t] = dict(rec, revoked=True)
+                    n += 1
+            if n:
+                write_json_atomic(self.tokens_path, table)
+                self.generation.bump()
+            return n
+
+
+class SqliteBackend:
+    """
+    One row per config key in a SQLite database (WAL mode).
+    - Updates touch only the changed keys
+    - Readers never block on writers (WAL); writers serialize on SQLite's own lock
+    - meta.generation is bumped on every write (config and tokens), doubles as the
+      cache signature and is published to the shared counter after COMMIT
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.generation = _Generation(path + ".gen")
+        self._local = threading.local()
+        # Per-process token lookup cache (hits and misses), dropped on any write.
+        self._lookups: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._lookups_gen: Optional[int] = None
+        self._lookups_sig: Optional[Tuple[Any, ...]] = None
+        self._lookups_checked = 0.0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # Connections must not cross a fork (gunicorn --preload).
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=10000")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS config (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS qr_tokens (
+                token TEXT PRIMARY KEY,
+                redirect_url TEXT NOT NULL DEFAULT '',
+                label TEXT NOT NULL DEFAULT '',
+                created_at INTEGER NOT NULL,
+                expires_at INTEGER,
+                revoked INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID;
+            INSERT OR IGNORE INTO meta (name, value) VALUES ('generation', 0);
+            """
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(qr_tokens)")}
+        if "label" not in columns:
+            # Databases created before token labels existed.
+            conn.execute("ALTER TABLE qr_tokens ADD COLUMN label TEXT NOT NULL DEFAULT ''")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def signature(self) -> Optional[Tuple[Any, ...]]:
+        row = self._conn().execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()
+        return (row[0],) if row else None
+
+    def _bump_generation(self, conn: sqlite3.Connection) -> int:
+        # Inside the write transaction: SQLite's write lock serializes this. Never
+        # below the shared counter, which older versions bumped on their own.
+        floor = (self.generation.value() or 0) + 1
+        conn.execute("UPDATE meta SET value = MAX(value + 1, ?) WHERE name = 'generation'", (floor,))
+        return conn.execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()[0]
+
+    def read(self) -> Optional[Dict[str, Any]]:
+        rows = self._conn().execute("SELECT key, value FROM config").fetchall()
+        if not rows:
+            return None
+        return {k: json.loads(v) for k, v in rows}
+
+    def _write(self, changes: Mapping[str, Any], replace: bool) -> None:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if replace:
+                conn.execute("DELETE FROM config")
+            conn.executemany(
+                "INSERT INTO config (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                [(k, json.dumps(v, ensure_ascii=False)) for k, v in changes.items()],
+            )
+            gen = self._bump_generation(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self.generation.publish(gen)
+
+    def write_all(self, cfg: Dict[str, Any]) -> None:
+        self._write(cfg, replace=True)
+
+    def update(self, changes: Mapping[str, Any]) -> None:
+        self._write(changes, replace=False)
+
+    _MAX_CACHED_LOOKUPS = 10000
+
+    def get_token(self, token: str) -> Optional[Dict[str, Any]]:
+        gen = self.generation.value()
+        now = time.monotonic()
+        if gen is None or gen != self._lookups_gen or now - self._lookups_checked >= SIGNATURE_RECHECK_S:
+            sig = self.signature()
+            if gen is None or gen != self._lookups_gen or sig != self._lookups_sig:
+                self._lookups = {}
+            self._lookups_gen, self._lookups_sig, self._lookups_checked = gen, sig, now
+        try:
+            return self._lookups[token]
+        except KeyError:
+            pass
+        rec = self._get_token_uncached(token)
+        if len(self._lookups) >= self._MAX_CACHED_LOOKUPS:
+            self._lookups = {}
+        self._lookups[token] = rec
+        return rec
+
+    def _get_token_uncached(self, token: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT redirect_url, label, created_at, expires_at, revoked FROM qr_tokens WHERE token = ?",
+            (token,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "redirect_url": row[0],
+            "label": row[1],
+            "created_at": row[2],
+            "expires_at": row[3],
+            "revoked": bool(row[4]),
+        }
+
+    def iter_tokens(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        # Dedicated connection: the cursor is consumed lazily (e.g. by a streaming response).
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            cur = conn.execute(
+                "SELECT token, redirect_url, label, created_at, expires_at, revoked FROM qr_tokens ORDER BY created_at, token"
+            )
+            for row in cur:
+                yield row[0], {
+                    "redirect_url": row[1],
+                    "label": row[2],
+                    "created_at": row[3],
+                    "expires_at": row[4],
+                    "revoked": bool(row[5]),
+                }
+        finally:
+            conn.close()
+
+    def put_tokens(self, records: List[Dict[str, Any]]) -> None:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                # Upsert: a re-sent token keeps its created_at and stays revoked.
+                "INSERT INTO qr_tokens (token, redirect_url, label, created_at, expires_at, revoked) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(token) DO UPDATE SET redirect_url = excluded.redirect_url, "
+                "label = excluded.label, expires_at = excluded.expires_at, "
+                "revoked = MAX(qr_tokens.revoked, excluded.revoked)",
+                [
+                    (
+                        r["token"],
+                        r.get("redirect_url") or "",
+                        r.get("label") or "",
+                        r["created_at"],
+                        r.get("expires_at"),
+                        int(bool(r.get("revoked"))),
+                    )
+                    for r in records
+                ],
+            )
+            gen = self._bump_generation(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self.generation.publish(gen)
+
+    def revoke_tokens(self, tokens: List[str]) -> int:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = conn.executemany(
+                "UPDATE qr_tokens SET revoked = 1 WHERE token = ? AND revoked = 0",
+                [(t,) for t in tokens],
+            )
+            gen = self._bump_generation(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self.generation.publish(gen)
+        return cur.rowcount
+
+
+_BACKENDS: Dict[Tuple[str, str], Any] = {}
+
+
+def get_backend():
+    """
+    Storage backend chosen by QR_CONFIG_BACKEND ("json" default, or "sqlite").
+    - json: QR_CONFIG_PATH (default: config.json next to this file)
+    - sqlite: QR_CONFIG_DB_PATH (default: QR_CONFIG_PATH with a .db suffix)
+    """
+    name = _backend_name()
+    if name == "sqlite":
+        key = (name, config_db_path())
+    elif name == "json":
+        key = (name, config_path())
+    else:
+        raise RuntimeError(f"Bilinmeyen QR_CONFIG_BACKEND: {name!r} (json | sqlite)")
+    backend = _BACKENDS.get(key)
+    if backend is None:
+        backend = SqliteBackend(key[1]) if name == "sqlite" else JsonBackend(key[1])
+        _BACKENDS[key] = backend
+    return backend
+
+
+# In-process cache of the merged config. Validated against the shared generation
+# counter (a memory read) and, at most every SIGNATURE_RECHECK_S, against the
+# backend's signature (config.json stat, or the SQLite generation row).
+_CACHE_LOCK = threading.RLock()
+_CACHE_KEY: Optional[Tuple[Any, ...]] = None
+_CACHE_VALUE: Optional[Mapping[str, Any]] = None
+_CACHE_GEN: Optional[int] = None
+_CACHE_CHECKED = 0.0
+_CACHE_STATS: Dict[str, int] = {"hits": 0, "misses": 0}
+
+
+def _load_config_uncached(backend) -> Dict[str, Any]:
     env_admin_token = (os.getenv("ADMIN_TOKEN") or "").strip()
-    if not os.path.exists(path):
+    stored = backend.read()
+    if stored is None:
         cfg = dict(DEFAULT_CONFIG)
         cfg["admin_token"] = env_admin_token or secrets.token_urlsafe(18)
         # If ADMIN_TOKEN is provided, we still write the config file so other fields persist.
         save_config(cfg)
         return cfg
 
-    with open(path, "r", encoding="utf-8") as f:
-        cfg = json.load(f)
-
     merged = dict(DEFAULT_CONFIG)
-    merged.update(cfg if isinstance(cfg, dict) else {})
+    merged.update(stored)
 
     # Allow overriding admin token via environment (recommended for cloud deploys).
     if env_admin_token:
         merged["admin_token"] = env_admin_token
     elif not merged.get("admin_token"):
         merged["admin_token"] = secrets.token_urlsafe(18)
-        save_config(merged)
+        update_config({"admin_token": merged["admin_token"]})
 
     return merged
 
 
+def _fresh_cached_value(backend, gen: Optional[int], env_admin_token: str, now: float) -> Optional[Mapping[str, Any]]:
+    """
+    The cached config if it can be served without touching the disk (same backend
+    and ADMIN_TOKEN, no write since, signature checked recently), else None.
+    """
+    key = _CACHE_KEY
+    value = _CACHE_VALUE
+    if (
+        key is not None
+        and value is not None
+        and gen is not None
+        and gen == _CACHE_GEN
+        and now - _CACHE_CHECKED < SIGNATURE_RECHECK_S
+        and key[:3] == (backend.name, backend.path, env_admin_token)
+    ):
+        _CACHE_STATS["hits"] += 1
+        return value
+    return None
+
+
+def config_snapshot() -> Mapping[str, Any]:
+    """
+    Returns a read-only view of the current config.
+    - Served from memory until any process writes (shared generation counter)
+      or the storage changes underneath (signature, re-checked every SIGNATURE_RECHECK_S)
+    - Use load_config() instead if you intend to modify and save it
+    """
+    global _CACHE_KEY, _CACHE_VALUE, _CACHE_GEN, _CACHE_CHECKED
+    backend = get_backend()
+    gen = backend.generation.value()
+    env_admin_token = (os.getenv("ADMIN_TOKEN") or "").strip()
+    now = time.monotonic()
+    value = _fresh_cached_value(backend, gen, env_admin_token, now)
+    if value is not None:
+        return value
+
+    value = _CACHE_VALUE
+    sig = backend.signature()
+    key = (backend.name, backend.path, env_admin_token, sig)
+    if sig is not None and value is not None and key == _CACHE_KEY:
+        _CACHE_GEN, _CACHE_CHECKED = gen, now
+        _CACHE_STATS["hits"] += 1
+        return value
+
+    with _CACHE_LOCK:
+        _CACHE_STATS["misses"] += 1
+        value = MappingProxyType(_load_config_uncached(backend))
+        # Re-read the signature after loading: the load itself may have written.
+        sig = backend.signature()
+        if sig is not None:
+            _CACHE_KEY = key[:-1] + (sig,)
+            _CACHE_VALUE = value
+            _CACHE_GEN, _CACHE_CHECKED = gen, now
+        return value
+
+
+def cached_config_snapshot() -> Optional[Mapping[str, Any]]:
+    """
+    config_snapshot() when it can be served from memory, else None; never touches
+    the disk. For callers on an event loop (asgi.py): on None they run
+    config_snapshot() in a thread.
+    """
+    backend = get_backend()
+    return _fresh_cached_value(
+        backend, backend.generation.value(), (os.getenv("ADMIN_TOKEN") or "").strip(), time.monotonic()
+    )
+
+
+def config_generation() -> Optional[int]:
+    """
+    Current value of the cross-process write counter (None if unavailable).
+    Any change means some process wrote config or tokens since you last looked.
+    """
+    return get_backend().generation.value()
+
+
+@metrics.timed("load_config")
+def load_config() -> Dict[str, Any]:
+    """
+    Returns a mutable copy of the current config (safe to modify + save_config()).
+    """
+    return dict(config_snapshot())
+
+
+def invalidate_config_cache() -> None:
+    # Lock-free on purpose: a writer may run while a reader holds _CACHE_LOCK.
+    global _CACHE_KEY
+    _CACHE_KEY = None
+
+
+def config_cache_stats() -> Dict[str, int]:
+    return dict(_CACHE_STATS)
+
+
+@metrics.timed("save_config")
 def save_config(cfg: Dict[str, Any]) -> None:
-    path = _config_path()
-    parent = os.path.dirname(path)
-    if parent:
-        os.makedirs(parent, exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(cfg, f, ensure_ascii=False, indent=2)
-        f.write("\n")
+    """
+    Replaces the whole config (JSON: temp file + fsync + rename; SQLite: one transaction).
+    Prefer update_config() for changing a few fields: it cannot lose concurrent updates.
+    """
+    get_backend().write_all(cfg)
+    invalidate_config_cache()
+
+
+class _PendingUpdate:
+    __slots__ = ("changes", "done", "error")
+
+    def __init__(self, changes: Dict[str, Any]) -> None:
+        self.changes = changes
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+_PENDING_LOCK = threading.Lock()
+_PENDING: List[_PendingUpdate] = []
+_FLUSHING = False
+
+
+def _flush_pending() -> None:
+    global _FLUSHING
+    while True:
+        with _PENDING_LOCK:
+            batch = list(_PENDING)
+            _PENDING.clear()
+            if not batch:
+                _FLUSHING = False
+                return
+        try:
+            changes: Dict[str, Any] = {}
+            for item in batch:
+                changes.update(item.changes)
+            get_backend().update(changes)
+            invalidate_config_cache()
+        except BaseException as e:
+            for item in batch:
+                item.error = e
+        finally:
+            for item in batch:
+                item.done.set()
+
+
+@metrics.timed("update_config")
+def update_config(changes: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Atomically applies `changes` on top of the latest stored config and returns the result.
+    - JSON: read-modify-write under a cross-process file lock; SQLite: only these keys are written
+    - Updates arriving while a write is in flight are coalesced into the next single write
+    """
+    global _FLUSHING
+    item = _PendingUpdate(dict(changes))
+    with _PENDING_LOCK:
+        _PENDING.append(item)
+        leader = not _FLUSHING
+        if leader:
+            _FLUSHING = True
+    if leader:
+        _flush_pending()
+    else:
+        item.done.wait()
+    if item.error is not None:
+        raise item.error
+    return load_config()
+
+
+def get_qr_token(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Looks up one gate token: {redirect_url, created_at, expires_at, revoked} or None.
+    JSON: in-memory dict (reloaded when the file changes); SQLite: primary-key lookup.
+    """
+    return get_backend().get_token(token)
+
+
+def create_qr_tokens(records: List[Dict[str, Any]]) -> None:
+    """
+    Inserts gate tokens. Each record needs "token" and "created_at";
+    "redirect_url", "label", "expires_at" (epoch seconds) and "revoked" are optional.
+    An existing token gets the new redirect_url / label / expires_at but keeps its
+    created_at, and a revoked token stays revoked (revocation is final).
+    """
+    if records:
+        get_backend().put_tokens(records)
+
+
+def iter_active_qr_tokens() -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Yields (token, record) for tokens that are neither revoked nor expired.
+    """
+    now = time.time()
+    for token, rec in get_backend().iter_tokens():
+        expires_at = rec.get("expires_at")
+        if rec.get("revoked") or (expires_at and expires_at <= now):
+            continue
+        yield token, rec
 
 
+def revoke_qr_tokens(tokens: List[str]) -> int:
+    """
+    Marks tokens as revoked; returns how many were newly revoked.
+    """
+    if not tokens:
+        return 0
+    return get_backend().revoke_tokens(tokens)
@@ -0,0 +1,197 @@
+"""
+Static export of the customer-facing pages (no Python process in the request path).
+
+Usage:
+  python export_static.py [--out static_export] [--html-redirects]
+
+Writes into --out:
+- info/index.html: the current /info page (same bytes Flask serves)
+- gone.html: the 410 text, for old / unknown QR codes
+- _redirects: "/r/<token> <url> 302" lines for active tokens (Netlify / Cloudflare Pages)
+- redirects.json: {"/r/<token>": url} for other CDNs / edge functions
+- r/<token>/index.html (--html-redirects): meta-refresh pages for plain file servers
+
+HTML / JSON files get .gz (and .br if brotli is installed) siblings for servers that
+serve precompressed files (nginx gzip_static / brotli_static, Caddy precompressed).
+
+Incremental: .export-manifest.json keeps the sha256 of every file written; files
+whose content did not change are not rewritten (mtime / CDN cache stays), files that
+are no longer produced (rotated / revoked tokens) are deleted.
+
+Tokens with an expiry are skipped: a static file cannot expire on time.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import time
+from pathlib import Path
+
+import gate
+import precompress
+import procutil
+from app import info_page
+from config_store import iter_active_qr_tokens, load_config
+
+
+MANIFEST_NAME = ".export-manifest.json"
+# Only these get .gz / .br siblings (_redirects is read by the CDN, not served).
+COMPRESSED_SUFFIXES = (".html", ".json")
+
+
+def _gate_token(cfg: dict) -> str:
+    # The machine that rotates (remote_rotate_enabled) holds the newest token as
+    # active_qr_token; a host only knows the one it was sent (current_qr_token).
+    if cfg.get("remote_rotate_enabled"):
+        return (cfg.get("active_qr_token") or "").strip()
+    return (cfg.get("current_qr_token") or "").strip()
+
+
+def _token_paths(token: str) -> list[str]:
+    paths = [f"/r/{token}"]
+    if gate.is_compact_token(token):
+        # QR payloads use /R/; some scanners lowercase the whole URL.
+        paths += [f"/R/{token}", f"/r/{token.lower()}"]
+    return paths
+
+
+def redirect_map(cfg: dict) -> tuple[dict[str, str], int]:
+    """
+    {"/r/<token>": url} for every token the gate would currently redirect, plus the
+    number of active tokens skipped because they expire.
+    """
+    redirect_url = (cfg.get("static_redirect_url") or "").strip()
+    mapping: dict[str, str] = {}
+    skipped = 0
+    for token, rec in iter_active_qr_tokens():
+        if rec.get("expires_at"):
+            skipped += 1
+            continue
+        target = (rec.get("redirect_url") or "").strip() or redirect_url
+        if target:
+            for path in _token_paths(token):
+                mapping[path] = target
+    current = _gate_token(cfg)
+    if current and redirect_url:
+        # Same precedence as gate.resolve(): the current token wins.
+        for path in _token_paths(current):
+            mapping[path] = redirect_url
+    return dict(sorted(mapping.items())), skipped
+
+
+def _redirect_page(url: str) -> bytes:
+    u = html.escape(url, quote=True)
+    return (
+        '<!doctype html>\n<html lang="tr"><head><meta charset="utf-8" />'
+        f'<meta http-equiv="refresh" content="0; url={u}" /><link rel="canonical" href="{u}" />'
+        f'<title>Yönlendiriliyor…</title></head><body><a href="{u}">{u}</a></body></html>\n'
+    ).encode("utf-8")
+
+
+def _gone_page() -> bytes:
+    text = html.escape(gate.GONE_MESSAGE)
+    return (
+        '<!doctype html>\n<html lang="tr"><head><meta charset="utf-8" />'
+        f"<title>{text}</title></head><body><p>{text}</p></body></html>\n"
+    ).encode("utf-8")
+
+
+def build_files(cfg: dict, html_redirects: bool) -> tuple[dict[str, bytes], int]:
+    """
+    {relative path: content} of the whole export (identity bodies only).
+    """
+    _, _, variants = info_page(cfg)
+    files = {"info/index.html": variants["identity"], "gone.html": _gone_page()}
+    mapping, skipped = redirect_map(cfg)
+    files["_redirects"] = "".join(f"{path} {url} 302\n" for path, url in mapping.items()).encode("utf-8")
+    files["redirects.json"] = (json.dumps(mapping, ensure_ascii=False, indent=2) + "\n").encode("utf-8")
+    if html_redirects:
+        for path, url in mapping.items():
+            files[path.lstrip("/") + "/index.html"] = _redirect_page(url)
+    return files, skipped
+
+
+def _remove(out: Path, rel: str) -> None:
+    path = out / rel
+    for p in [path] + [path.with_name(path.name + s) for s in precompress.SUFFIXES.values()]:
+        try:
+            p.unlink()
+        except FileNotFoundError:
+            pass
+    # Drop now-empty token directories (r/<token>/).
+    parent = path.parent
+    while parent != out and out in parent.parents:
+        try:
+            parent.rmdir()
+        except OSError:
+            break
+        parent = parent.parent
+
+
+def export(out: Path, cfg: dict, html_redirects: bool = False) -> dict[str, int]:
+    files, skipped = build_files(cfg, html_redirects)
+    manifest_path = out / MANIFEST_NAME
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            previous = json.load(f).get("files", {})
+    except (OSError, ValueError):
+        previous = {}
+
+    stats = {"written": 0, "unchanged": 0, "removed": 0, "skipped_expiring": skipped}
+    current: dict[str, str] = {}
+    for rel, data in files.items():
+        digest = hashlib.sha256(data).hexdigest()
+        current[rel] = digest
+        path = out / rel
+        if previous.get(rel) == digest and path.exists():
+            stats["unchanged"] += 1
+            continue
+        encoded = precompress.encode(data) if rel.endswith(COMPRESSED_SUFFIXES) else {"identity": data}
+        for coding, suffix in precompress.SUFFIXES.items():
+            variant = path.with_name(path.name + suffix)
+            if coding in encoded:
+                procutil.write_atomic(str(variant), encoded[coding])
+            elif variant.exists():
+                variant.unlink()
+        procutil.write_atomic(str(path), data)
+        stats["written"] += 1
+
+    for rel in previous.keys() - current.keys():
+        _remove(out, rel)
+        stats["removed"] += 1
+
+    procutil.write_atomic(
+        str(manifest_path),
+        (json.dumps({"files": current}, indent=2, sort_keys=True) + "\n").encode("utf-8"),
+    )
+    return stats
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Bilgi sayfasını ve yönlendirmeleri statik dosya olarak dışa aktar")
+    parser.add_argument("--out", type=Path, default=Path("static_export"))
+    parser.add_argument(
+        "--html-redirects",
+        action="store_true",
+        help="her token için r/<token>/index.html (yönlendirme desteği olmayan dosya sunucuları için)",
+    )
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    stats = export(args.out, load_config(), args.html_redirects)
+    ms = (time.perf_counter() - t0) * 1000
+    print(
+        f"Statik dışa aktarma: {args.out} — {stats['written']} yazıldı, "
+        f"{stats['unchanged']} değişmedi, {stats['removed']} silindi ({ms:.0f} ms)"
+    )
+    if stats["skipped_expiring"]:
+        print(f"Not: süreli {stats['skipped_expiring']} token atlandı (statik dosya süre dolumunu uygulayamaz).")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,85 @@
+"""
+QR gate decision logic (/r/<token>), shared by the Flask route and the WSGI / ASGI fast paths.
+
+No Flask imports here: resolve() only needs the cached config snapshot and the
+token table, and returns a plain (status, value) pair.
+"""
+
+from __future__ import annotations
+
+import hmac
+import time
+from typing import Any, Mapping, Optional, Tuple
+
+from config_store import config_snapshot, get_qr_token
+
+
+# Compact tokens: uppercase base36 (28 chars ~ 144 bits, same as token_urlsafe(18)).
+# With an uppercased scheme/host and /R/ they keep the whole URL in QR alphanumeric mode.
+COMPACT_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+COMPACT_TOKEN_LEN = 28
+
+GONE_MESSAGE = "QR artık geçersiz (yeni QR üretildi)."
+NOT_CONFIGURED_MESSAGE = (
+    "QR henüz aktif edilmedi (Not configured).\n"
+    "Bu host'a ilk token'ı göndermek için bilgisayarındaki uygulamayı 1 kez çalıştırıp\n"
+    "remote_rotate_enabled=true iken /api/rotate çağrısını yaptırmalısın.\n"
+)
+
+
+def is_compact_token(token: str) -> bool:
+    return len(token) == COMPACT_TOKEN_LEN and all(ch in COMPACT_ALPHABET for ch in token)
+
+
+def token_candidates(token: str) -> Tuple[str, ...]:
+    """
+    Tokens to try for a gate hit: as given, plus its uppercase form when that is a
+    compact token (some scanners / keyboards lowercase alphanumeric-mode URLs).
+    """
+    upper = token.upper()
+    if upper != token and is_compact_token(upper):
+        return (token, upper)
+    return (token,)
+
+
+def _matches(candidate: str, current: str) -> bool:
+    # Constant-time: the gate must not leak how much of the current token a guess got right.
+    return hmac.compare_digest(candidate.encode("utf-8"), current.encode("utf-8"))
+
+
+def matches_current(token: str, current: str) -> bool:
+    """
+    True when `token` (or its uppercase compact form) is the current token.
+    """
+    return any(_matches(c, current) for c in token_candidates(token))
+
+
+def resolve(token: str, cfg: Optional[Mapping[str, Any]] = None) -> Tuple[int, str]:
+    """
+    Returns (302, redirect_url) or (410, message):
+    - token matches current_qr_token -> static_redirect_url
+    - token is in the token table (not revoked / expired) -> its redirect_url
+    - else -> 410 Gone (old QR invalid, or gate not configured yet)
+    `cfg`: a config_snapshot() the caller already holds.
+    """
+    if cfg is None:
+        cfg = config_snapshot()
+    current = (cfg.get("current_qr_token") or "").strip()
+    redirect_url = (cfg.get("static_redirect_url") or "").strip()
+    if current and redirect_url and matches_current(token, current):
+        return 302, redirect_url
+
+    for candidate in token_candidates(token):
+        rec = get_qr_token(candidate)
+        if rec is None:
+            continue
+        expires_at = rec.get("expires_at")
+        if rec.get("revoked") or (expires_at and expires_at <= time.time()):
+            return 410, GONE_MESSAGE
+        target = (rec.get("redirect_url") or "").strip() or redirect_url
+        if target:
+            return 302, target
+
+    if not current or not redirect_url:
+        return 410, NOT_CONFIGURED_MESSAGE
+    return 410, GONE_MESSAGE
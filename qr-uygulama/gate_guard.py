@@ -0,0 +1,243 @@
+"""
+Admission control in front of the /r/<token> gate (shared by Flask, wsgi.py and asgi.py).
+
+- the current token is matched first, before any limiter or lock: scans of the
+  printed QR in use never wait behind other traffic
+- recently rejected tokens (old printed QRs, bot guesses) sit in a bounded negative
+  cache and get their 410 without a storage lookup; the cache is dropped whenever
+  any process writes config or tokens (shared generation counter) and entries
+  expire after QR_GATE_NEGATIVE_TTL seconds
+- every other lookup first takes a token from the client's per-IP bucket: an
+  empty bucket answers 429 without touching storage; a lookup that finds a valid
+  token-table code (302) gives its token back, so only misses drain the bucket
+- misses (unknown, revoked or expired tokens) are then charged to a global bucket
+  after the lookup; a valid code therefore never gets 429 from a flood spread over
+  many addresses
+- refused requests (429) are never added to the negative cache, which is kept for
+  the old printed QRs it exists for
+- counters are per worker process (see stats()); the current-token and negative
+  cache paths take no lock
+- check_cached() answers only from memory (never touches storage), for callers on
+  an event loop that run check() in a thread otherwise (asgi.py)
+
+Tuning (environment, read once per process):
+- QR_GATE_IP_RATE / QR_GATE_IP_BURST: per client IP, misses per second / burst (10 / 100;
+  generous, since one carrier-NAT address can stand for many phones)
+- QR_GATE_GLOBAL_RATE / QR_GATE_GLOBAL_BURST: per worker (200 / 400)
+- QR_GATE_NEGATIVE_TTL: seconds (300); 0 disables the negative cache
+- QR_GATE_LIMITS=0 disables the buckets
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import gate
+from config_store import cached_config_snapshot, config_generation, config_snapshot
+
+
+RATE_LIMITED_MESSAGE = "Çok fazla istek. Lütfen birkaç saniye sonra tekrar deneyin."
+RETRY_AFTER_S = 1
+
+MAX_TRACKED_IPS = 10000
+NEGATIVE_CACHE_SIZE = 10000
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.getenv(name) or default))
+    except ValueError:
+        return default
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens per second, at most `burst` stored.
+    Not thread-safe on its own; callers hold the guard lock.
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float) -> None:
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = now
+
+    def take(self, now: float) -> bool:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class GateGuard:
+    def __init__(self) -> None:
+        self.limits_enabled = (os.getenv("QR_GATE_LIMITS") or "1").strip() not in ("0", "false", "off")
+        self.ip_rate = _env_float("QR_GATE_IP_RATE", 10.0)
+        self.ip_burst = _env_float("QR_GATE_IP_BURST", 100.0)
+        self.negative_ttl_s = _env_float("QR_GATE_NEGATIVE_TTL", 300.0)
+        now = time.monotonic()
+        self._global = TokenBucket(
+            _env_float("QR_GATE_GLOBAL_RATE", 200.0), _env_float("QR_GATE_GLOBAL_BURST", 400.0), now
+        )
+        self._ips: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        # token -> expiry (monotonic); only GONE answers are cached.
+        self._negative: Dict[str, float] = {}
+        self._negative_gen: Optional[int] = None
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {
+            "current_hits": 0,
+            "lookups": 0,
+            "negative_cache_hits": 0,
+            "rejected_ip": 0,
+            "rejected_global": 0,
+        }
+
+    def _remember_gone(self, token: str, gen: Optional[int], now: float) -> None:
+        if gen is None or not self.negative_ttl_s:
+            return
+        with self._lock:
+            if gen != self._negative_gen:
+                # Some process wrote config / tokens: a rejected token may be valid now.
+                self._negative = {}
+                self._negative_gen = gen
+            negative = self._negative
+            negative.pop(token, None)
+            negative[token] = now + self.negative_ttl_s
+            while len(negative) > NEGATIVE_CACHE_SIZE:
+                del negative[next(iter(negative))]  # oldest first (insertion order)
+
+    def _take_ip(self, client_ip: str, now: float) -> bool:
+        with self._lock:
+            bucket = self._ips.get(client_ip)
+            if bucket is None:
+                bucket = self._ips[client_ip] = TokenBucket(self.ip_rate, self.ip_burst, now)
+                while len(self._ips) > MAX_TRACKED_IPS:
+                    self._ips.popitem(last=False)
+            else:
+                self._ips.move_to_end(client_ip)
+            return not self.ip_rate or bucket.take(now)
+
+    def _give_back_ip(self, client_ip: str) -> None:
+        with self._lock:
+            bucket = self._ips.get(client_ip)
+            if bucket is not None:
+                bucket.tokens = min(bucket.burst, bucket.tokens + 1.0)
+
+    def _take_global(self, now: float) -> bool:
+        with self._lock:
+            return not self._global.rate or self._global.take(now)
+
+    def _from_memory(self, token: str, cfg) -> Optional[Tuple[int, str]]:
+        # Current token, then the negative cache; None when storage must be asked.
+        counters = self.counters
+        current = (cfg.get("current_qr_token") or "").strip()
+        redirect_url = (cfg.get("static_redirect_url") or "").strip()
+        if current and redirect_url and gate.matches_current(token, current):
+            counters["current_hits"] += 1
+            return 302, redirect_url
+
+        # Lock-free read: _remember_gone() swaps in a new dict instead of clearing.
+        gen = config_generation()
+        if gen is not None and gen == self._negative_gen:
+            expires = self._negative.get(token)
+            if expires is not None and expires > time.monotonic():
+                counters["negative_cache_hits"] += 1
+                return 410, gate.GONE_MESSAGE
+        return None
+
+    def check_cached(self, token: str) -> Optional[Tuple[int, str]]:
+        """
+        check() if it can be answered without touching storage, else None.
+        """
+        cfg = cached_config_snapshot()
+        return None if cfg is None else self._from_memory(token, cfg)
+
+    def check(self, token: str, client_ip: str) -> Tuple[int, str]:
+        """
+        gate.resolve() behind the negative cache and the per-IP bucket; misses are
+        also charged to the global bucket.
+        Returns (302, url), (410, message) or (429, RATE_LIMITED_MESSAGE).
+        """
+        counters = self.counters
+        cfg = config_snapshot()
+        answer = self._from_memory(token, cfg)
+        if answer is not None:
+            return answer
+
+        now = time.monotonic()
+        gen = config_generation()
+        limited = self.limits_enabled
+        if limited and not self._take_ip(client_ip, now):
+            counters["rejected_ip"] += 1
+            return 429, RATE_LIMITED_MESSAGE
+        counters["lookups"] += 1
+        code, value = gate.resolve(token, cfg)
+        if code != 410:
+            if limited:
+                self._give_back_ip(client_ip)
+            return code, value
+
+        if limited and not self._take_global(now):
+            counters["rejected_global"] += 1
+            return 429, RATE_LIMITED_MESSAGE
+        if value == gate.GONE_MESSAGE:
+            self._remember_gone(token, gen, now)
+        return code, value
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                **self.counters,
+                "negative_cache_size": len(self._negative),
+                "tracked_ips": len(self._ips),
+            }
+
+
+_GUARD: Optional[GateGuard] = None
+_GUARD_LOCK = threading.Lock()
+
+
+def _guard() -> GateGuard:
+    global _GUARD
+    guard = _GUARD
+    if guard is None:
+        with _GUARD_LOCK:
+            if _GUARD is None:
+                _GUARD = GateGuard()
+            guard = _GUARD
+    return guard
+
+
+def check(token: str, client_ip: str) -> Tuple[int, str]:
+    return _guard().check(token, client_ip)
+
+
+def check_cached(token: str) -> Optional[Tuple[int, str]]:
+    return _guard().check_cached(token)
+
+
+def stats() -> Dict[str, int]:
+    """
+    Counters of this worker process (each gunicorn / uvicorn worker keeps its own).
+    """
+    return _guard().stats()
+
+
+def client_ip(remote_addr: str, forwarded_for: str) -> str:
+    """
+    Client address for the WSGI / ASGI fast paths, matching ProxyFix(x_for=1) in
+    app.py: the last X-Forwarded-For entry (added by the one trusted proxy).
+    """
+    if forwarded_for:
+        last = forwarded_for.rsplit(",", 1)[-1].strip()
+        if last:
+            return last
+    return remote_addr or ""
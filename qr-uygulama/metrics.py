@@ -0,0 +1,329 @@
+"""
+Prometheus text metrics (/metrics), aggregated across gunicorn / uvicorn workers.
+
+- observe() / count() only touch this process's dicts: a bisect and a few list
+  increments, no lock and no I/O (a rare lost increment between threads is
+  accepted in exchange for a lock-free hot path)
+- a daemon thread writes the process snapshot to <dir>/<pid>.json every few
+  seconds; /metrics flushes its own process and sums every file in the directory
+- files of dead workers are absorbed by a live one (atomic rename, so exactly one
+  worker takes each) and carried in its snapshot: totals never go backwards when
+  gunicorn recycles a worker or the service restarts
+
+Directory: QR_METRICS_DIR, or metrics/ next to the config. QR_METRICS=0 disables
+collection (read once per process) and /metrics answers 404.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Tuple
+
+import procutil
+
+
+# Upper bounds (seconds); a request outside the gate fast path is rarely < 0.5 ms.
+BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+FLUSH_INTERVAL_S = 5.0
+
+HELP = {
+    "qr_http_requests_total": ("counter", "HTTP requests by route template, method and status."),
+    "qr_http_request_duration_seconds": ("histogram", "Time to build the response, by route template."),
+    "qr_op_duration_seconds": ("histogram", "Time spent in hot-path operations (config, QR, remote sync)."),
+}
+
+_ENABLED = (os.getenv("QR_METRICS") or "1").strip() not in ("0", "false", "off")
+
+# "name\x1flabels" -> [count per bucket..., +Inf, sum, count] / counter value.
+_hist: Dict[str, List[float]] = {}
+_counters: Dict[str, float] = {}
+# Totals taken over from dead workers (merged into this process's snapshot).
+_absorbed_hist: Dict[str, List[float]] = {}
+_absorbed_counters: Dict[str, float] = {}
+_absorb_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return _ENABLED
+
+
+def metrics_dir() -> str:
+    env_path = (os.getenv("QR_METRICS_DIR") or "").strip()
+    if env_path:
+        return env_path
+    # Imported here: config_store imports this module.
+    from config_store import config_path
+
+    return os.path.join(os.path.dirname(config_path()) or ".", "metrics")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_KEYS: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], str] = {}
+
+
+def _key(name: str, labels: Tuple[Tuple[str, str], ...]) -> str:
+    # Memoized: label sets are few (route templates, op names), the formatting is not free.
+    key = _KEYS.get((name, labels))
+    if key is None:
+        key = name + "\x1f" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+        if len(_KEYS) < 10000:
+            _KEYS[(name, labels)] = key
+    return key
+
+
+def _sample(key: str, seconds: float) -> None:
+    series = _hist.get(key)
+    if series is None:
+        series = _hist.setdefault(key, [0] * (len(BUCKETS) + 1) + [0.0, 0])
+    series[bisect_left(BUCKETS, seconds)] += 1
+    series[-2] += seconds
+    series[-1] += 1
+
+
+def observe(name: str, seconds: float, labels: Tuple[Tuple[str, str], ...] = ()) -> None:
+    """
+    Adds one sample to the histogram `name`{labels}.
+    """
+    if not _ENABLED:
+        return
+    if _FLUSHER.pid != os.getpid():
+        _FLUSHER.start(_on_flusher_start)
+    _sample(_key(name, labels), seconds)
+
+
+def count(name: str, labels: Tuple[Tuple[str, str], ...] = (), amount: float = 1) -> None:
+    if not _ENABLED:
+        return
+    if _FLUSHER.pid != os.getpid():
+        _FLUSHER.start(_on_flusher_start)
+    key = _key(name, labels)
+    _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe_op(op: str, seconds: float) -> None:
+    observe("qr_op_duration_seconds", seconds, (("op", op),))
+
+
+_REQUEST_KEYS: Dict[Tuple[str, str, int], Tuple[str, str]] = {}
+
+
+def observe_request(route: str, method: str, status: int, seconds: float) -> None:
+    """
+    One request: qr_http_requests_total{route,method,status} + duration histogram.
+    Called on every request (including the gate fast paths), so the keys are memoized.
+    """
+    if not _ENABLED:
+        return
+    if _FLUSHER.pid != os.getpid():
+        _FLUSHER.start(_on_flusher_start)
+    keys = _REQUEST_KEYS.get((route, method, status))
+    if keys is None:
+        keys = (
+            _key("qr_http_requests_total", (("route", route), ("method", method), ("status", str(status)))),
+            _key("qr_http_request_duration_seconds", (("route", route),)),
+        )
+        if len(_REQUEST_KEYS) < 10000:
+            _REQUEST_KEYS[(route, method, status)] = keys
+    _counters[keys[0]] = _counters.get(keys[0], 0) + 1
+    _sample(keys[1], seconds)
+
+
+def timed(op: str) -> Callable:
+    """
+    Decorator: records each call's duration as qr_op_duration_seconds{op=...}.
+    """
+
+    key = _key("qr_op_duration_seconds", (("op", op),))
+
+    def decorate(fn: Callable) -> Callable:
+        if not _ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                if _FLUSHER.pid != os.getpid():
+                    _FLUSHER.start(_on_flusher_start)
+                _sample(key, time.perf_counter() - t0)
+
+        return wrapper
+
+    return decorate
+
+
+def _merge(into_hist: Dict[str, List[float]], into_counters: Dict[str, float], data: Dict[str, Any]) -> None:
+    for key, series in (data.get("hist") or {}).items():
+        if len(series) != len(BUCKETS) + 3:
+            continue  # written with other buckets; skip rather than misplace samples
+        target = into_hist.setdefault(key, [0] * (len(BUCKETS) + 1) + [0.0, 0])
+        for i, value in enumerate(series):
+            target[i] += value
+    for key, value in (data.get("counters") or {}).items():
+        into_counters[key] = into_counters.get(key, 0) + value
+
+
+def snapshot() -> Dict[str, Any]:
+    """
+    This process's totals (own samples + absorbed dead workers), JSON-ready.
+    """
+    hist: Dict[str, List[float]] = {}
+    counters: Dict[str, float] = {}
+    with _absorb_lock:
+        _merge(hist, counters, {"hist": _absorbed_hist, "counters": _absorbed_counters})
+    _merge(hist, counters, {"hist": dict(_hist), "counters": dict(_counters)})
+    return {"pid": os.getpid(), "written_at": time.time(), "hist": hist, "counters": counters}
+
+
+def flush() -> None:
+    """
+    Writes this process's snapshot to <dir>/<pid>.json.
+    """
+    directory = metrics_dir()
+    os.makedirs(directory, exist_ok=True)
+    procutil.write_atomic(os.path.join(directory, f"{os.getpid()}.json"), json.dumps(snapshot()).encode("utf-8"))
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill(pid, 0) is not a probe on Windows; the local app is one process anyway.
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _absorb(path: str) -> None:
+    # Whoever renames the file first owns its totals; others get FileNotFoundError.
+    claimed = f"{path}.absorbed.{os.getpid()}"
+    try:
+        os.rename(path, claimed)
+    except OSError:
+        return
+    try:
+        with open(claimed, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    with _absorb_lock:
+        _merge(_absorbed_hist, _absorbed_counters, data)
+    # Persist before dropping the claimed file, so the totals are on disk at all times.
+    flush()
+    try:
+        os.remove(claimed)
+    except OSError:
+        pass
+
+
+def _absorb_dead() -> None:
+    directory = metrics_dir()
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    me = os.getpid()
+    for name in names:
+        pid_text, _, suffix = name.partition(".")
+        if suffix != "json" or not pid_text.isdigit():
+            continue
+        pid = int(pid_text)
+        if pid == me or _pid_alive(pid):
+            continue
+        _absorb(os.path.join(directory, name))
+
+
+def _on_flusher_start(forked: bool) -> None:
+    if forked:
+        # Forked child: the parent's samples are not ours.
+        _hist.clear()
+        _counters.clear()
+        with _absorb_lock:
+            _absorbed_hist.clear()
+            _absorbed_counters.clear()
+    # A file under our pid belongs to a dead process that had the same pid.
+    stale = os.path.join(metrics_dir(), f"{os.getpid()}.json")
+    if os.path.exists(stale):
+        _absorb(stale)
+
+
+_FLUSHER = procutil.ProcessDaemon("metrics-flush", procutil.every(FLUSH_INTERVAL_S, flush))
+
+
+def collect() -> Tuple[Dict[str, List[float]], Dict[str, float], int]:
+    """
+    Sums the snapshots of all workers: (histograms, counters, number of files).
+    """
+    _absorb_dead()
+    flush()
+    hist: Dict[str, List[float]] = {}
+    counters: Dict[str, float] = {}
+    directory = metrics_dir()
+    files = 0
+    for name in os.listdir(directory):
+        pid_text, _, suffix = name.partition(".")
+        if suffix != "json" or not pid_text.isdigit():
+            continue
+        try:
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        _merge(hist, counters, data)
+        files += 1
+    return hist, counters, files
+
+
+def _fmt(value: float) -> str:
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def render() -> str:
+    """
+    All workers' metrics in the Prometheus text exposition format (0.0.4).
+    """
+    hist, counters, files = collect()
+    by_name: Dict[str, List[Tuple[str, Any]]] = {}
+    for key, value in list(counters.items()) + list(hist.items()):
+        name, _, labels = key.partition("\x1f")
+        by_name.setdefault(name, []).append((labels, value))
+
+    lines = []
+    for name in sorted(by_name):
+        kind, text = HELP.get(name, ("untyped", name))
+        lines.append(f"# HELP {name} {text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(by_name[name], key=lambda item: item[0]):
+            if kind != "histogram":
+                lines.append(f"{name}{{{labels}}} {_fmt(value)}" if labels else f"{name} {_fmt(value)}")
+                continue
+            prefix = labels + "," if labels else ""
+            cumulative = 0
+            for bound, n in zip(BUCKETS + (float("inf"),), value):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{name}_bucket{{{prefix}le="{le}"}} {_fmt(cumulative)}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{name}_sum{suffix} {_fmt(value[-2])}")
+            lines.append(f"{name}_count{suffix} {_fmt(value[-1])}")
+    lines.append("# HELP qr_metrics_workers Worker snapshots summed into this scrape.")
+    lines.append("# TYPE qr_metrics_workers gauge")
+    lines.append(f"qr_metrics_workers {files}")
+    return "\n".join(lines) + "\n"
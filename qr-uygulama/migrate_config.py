@@ -0,0 +1,35 @@
+"""
+Imports an existing config.json into the SQLite config backend.
+
+Usage:
+  python migrate_config.py [config.json] [config.db]
+
+Defaults to QR_CONFIG_PATH / QR_CONFIG_DB_PATH (same as the app). After migrating,
+set QR_CONFIG_BACKEND=sqlite so the app reads from the database.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+
+from config_store import JsonBackend, SqliteBackend, config_db_path, config_path
+
+
+def main(argv: list[str]) -> int:
+    json_path = argv[1] if len(argv) > 1 else config_path()
+    db_path = argv[2] if len(argv) > 2 else config_db_path()
+
+    if not os.path.exists(json_path):
+        print("Hata: config.json bulunamadı:", json_path)
+        return 1
+
+    cfg = JsonBackend(json_path).read() or {}
+    SqliteBackend(db_path).write_all(cfg)
+    print(f"OK: {len(cfg)} alan aktarıldı: {json_path} -> {db_path}")
+    print("Şimdi QR_CONFIG_BACKEND=sqlite ayarlayın.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
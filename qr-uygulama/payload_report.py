@@ -0,0 +1,51 @@
+"""
+Compares QR size for the default and the compact (alphanumeric-mode) gate payload.
+
+Usage:
+  python payload_report.py [base_url]
+
+base_url defaults to public_base_url from config.json. For each error-correction
+level it prints the QR version, modules per side and the data modes used.
+"""
+
+from __future__ import annotations
+
+import sys
+
+import qrcode.util
+
+import qr_render
+from app import gate_payload, new_qr_token
+from config_store import load_config
+
+
+def _modes(payload: str) -> str:
+    names = {qrcode.util.MODE_NUMBER: "num", qrcode.util.MODE_ALPHA_NUM: "alnum", qrcode.util.MODE_8BIT_BYTE: "byte"}
+    chunks = qrcode.util.optimal_data_chunks(payload.encode("utf-8"))
+    return "+".join(names.get(c.mode, "?") for c in chunks)
+
+
+def main(argv: list[str]) -> int:
+    cfg = load_config()
+    base = argv[1] if len(argv) > 1 else (cfg.get("public_base_url") or "").strip() or "https://example.onrender.com"
+    payloads = {
+        "default": gate_payload(base, new_qr_token({"qr_payload_mode": "default"})),
+        "compact": gate_payload(base, new_qr_token({"qr_payload_mode": "compact"})),
+    }
+    for name, payload in payloads.items():
+        print(f"{name:<8} {len(payload):>3} karakter  {_modes(payload):<12} {payload}")
+    print()
+    print(f"{'ec':<3} {'default':>16} {'compact':>16} {'modül farkı':>12}")
+    for ec in qr_render.ERROR_CORRECTION_LEVELS:
+        sizes = {}
+        for name, payload in payloads.items():
+            n = len(qr_render.qr_matrix(payload, ec))
+            sizes[name] = (((n - 17) // 4), n)
+        d, c = sizes["default"], sizes["compact"]
+        saved = d[1] * d[1] - c[1] * c[1]
+        print(f"{ec:<3} {f'v{d[0]} ({d[1]}x{d[1]})':>16} {f'v{c[0]} ({c[1]}x{c[1]})':>16} {saved:>12}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
@@ -0,0 +1,62 @@
+"""
+Pre-encoded response bodies (identity / gzip / optional brotli).
+
+- encode() compresses a body once, at the highest level, so the per-request cost is a
+  dict lookup; gzip output is deterministic (mtime=0), so ETags stay stable
+- a variant is only kept if it is actually smaller than the identity body
+- negotiate() picks the variant for an Accept-Encoding header (br > gzip > identity on ties)
+- brotli is optional: without the package only gzip is produced
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+from typing import Dict
+
+try:
+    import brotli  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover
+    brotli = None
+
+
+# Preference order when the client accepts several with the same quality.
+PREFERENCE = ("br", "gzip", "identity")
+# File suffix used for precompressed static files (see export_static.py).
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def encode(data: bytes) -> Dict[str, bytes]:
+    """
+    {"identity": data, "gzip": ..., "br": ...} (compressed variants only if smaller).
+    """
+    variants = {"identity": data}
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data):
+        variants["gzip"] = gz
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        if len(br) < len(data):
+            variants["br"] = br
+    return variants
+
+
+def etag(data: bytes) -> str:
+    """
+    Strong validator of the identity body (unquoted); variants append "-<coding>".
+    """
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def negotiate(accept_encodings, available) -> str:
+    """
+    accept_encodings: werkzeug Accept (request.accept_encodings); returns a key of `available`.
+    """
+    best, best_q = "identity", 0.0
+    for coding in PREFERENCE:
+        if coding == "identity" or coding not in available:
+            continue
+        q = accept_encodings.quality(coding)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
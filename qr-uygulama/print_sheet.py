@@ -0,0 +1,86 @@
+"""
+Print-ready A4 sheets (PDF) of labelled QR codes.
+
+Usage:
+  python print_sheet.py <manifest.jsonl | manifest.json | codes.csv> [-o qr-sheet.pdf] [--cols 3] [--rows 4] [--ec M]
+
+- manifest.jsonl: written by bulk_generate.py next to manifest.json (one token per line)
+- manifest.json:  read through its manifest.jsonl sibling when there is one; otherwise
+                  (manifests of older versions) loaded whole
+- codes.csv:      label, payload (header row optional)
+Without an input file, the sheet holds the currently active QR from config.json.
+
+Input is read line by line and pages are written as they are produced, so memory use
+does not grow with the number of codes (except for an old manifest.json without .jsonl).
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Iterator, Tuple
+
+import qr_sheet
+from config_store import load_config
+
+
+def _iter_items(path: Path | None) -> Iterator[Tuple[str, str]]:
+    if path is None:
+        from app import qr_payload_for_saved_png
+
+        yield "QR", qr_payload_for_saved_png(load_config())
+        return
+    suffix = path.suffix.lower()
+    if suffix == ".json" and path.with_suffix(".jsonl").exists():
+        path, suffix = path.with_suffix(".jsonl"), ".jsonl"
+    if suffix == ".jsonl":
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    t = json.loads(line)
+                    yield t.get("label") or t["token"][:8], t["payload"]
+        return
+    if suffix == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            for t in json.load(f).get("tokens", []):
+                yield t.get("label") or t["token"][:8], t["payload"]
+        return
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        for i, rec in enumerate(csv.reader(f)):
+            if len(rec) < 2 or (i == 0 and rec[0].strip().lower() == "label"):
+                continue
+            yield rec[0].strip(), rec[1].strip()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Yazdırılabilir QR sayfası (PDF)")
+    parser.add_argument("input", type=Path, nargs="?", default=None)
+    parser.add_argument("-o", "--output", type=Path, default=Path("qr-sheet.pdf"))
+    parser.add_argument("--cols", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=4)
+    parser.add_argument("--ec", choices=["L", "M", "Q", "H"], default="M")
+    args = parser.parse_args(argv)
+
+    tmp = args.output.with_name(args.output.name + ".tmp")
+    count = 0
+
+    def counted() -> Iterator[Tuple[str, str]]:
+        nonlocal count
+        for item in _iter_items(args.input):
+            count += 1
+            yield item
+
+    with open(tmp, "wb") as f:
+        for chunk in qr_sheet.iter_sheet_pdf(counted(), cols=args.cols, rows=args.rows, error_correction=args.ec):
+            f.write(chunk)
+    os.replace(tmp, args.output)
+    print(f"OK: {count} QR -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Process-level helpers shared by config_store, metrics, scan_analytics, sync_outbox
+and export_static. Imports nothing from the app, so any module can use it.
+
+- write_atomic(): temp file + rename, readers see the old or the new file, never half
+- ProcessDaemon: a background thread started lazily, once per process
+- every(): loop body for periodic daemons
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Optional
+
+
+def write_atomic(path: str, data: bytes, durable: bool = False) -> None:
+    """
+    Writes `data` to a temp file next to `path` and renames it over `path`.
+    durable=True also fsyncs the file and (POSIX) the directory, so the rename
+    survives a power cut.
+    """
+    parent = os.path.dirname(path) or "."
+    os.makedirs(parent, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix="." + os.path.basename(path) + ".", suffix=".tmp", dir=parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        for attempt in range(5):
+            try:
+                os.replace(tmp_path, path)
+                break
+            except PermissionError:  # pragma: no cover - Windows: target briefly open by a reader
+                if attempt == 4:
+                    raise
+                time.sleep(0.02 * (attempt + 1))
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    if durable and os.name == "posix":
+        # Persist the rename itself.
+        dir_fd = os.open(parent, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+class ProcessDaemon:
+    """
+    A daemon thread running `target`, started by the first start() call in each
+    process. Started lazily rather than at import so it survives gunicorn --preload
+    forks (threads do not cross a fork). Hot paths test `daemon.pid != os.getpid()`
+    before calling start(), which costs no lock.
+    """
+
+    def __init__(self, name: str, target: Callable[[], None]) -> None:
+        self.name = name
+        self.target = target
+        self.pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def start(self, on_start: Optional[Callable[[bool], None]] = None) -> bool:
+        """
+        Starts the thread unless this process already has it; returns True if it
+        was started now. on_start(forked) runs first, under the lock; forked is True
+        when a parent process had started it (its in-memory state is not ours).
+        """
+        with self._lock:
+            if self.pid == os.getpid():
+                return False
+            forked = self.pid is not None
+            self.pid = os.getpid()
+            if on_start is not None:
+                on_start(forked)
+            threading.Thread(target=self.target, name=self.name, daemon=True).start()
+        return True
+
+
+def every(interval_s: float, fn: Callable[[], object]) -> Callable[[], None]:
+    """
+    Loop for a ProcessDaemon: calls fn() every interval_s seconds, forever.
+    Errors are swallowed (background work must never take a worker down); the
+    next round retries.
+    """
+
+    def loop() -> None:
+        while True:
+            time.sleep(interval_s)
+            try:
+                fn()
+            except Exception:
+                pass
+
+    return loop
@@ -0,0 +1,294 @@
+"""
+QR rendering (PNG or SVG) with an in-process cache of encoded images.
+
+The pipeline is split in two:
+- qr_matrix(): version/mask/module selection by the qrcode library, memoized per
+  (payload, error_correction)
+- rasterize_png() / _render_svg(): pure drawing of that matrix at any scale; PNG is
+  1-bit grayscale, scaled with NumPy when available, and zlib-encoded directly (no PIL)
+
+Encoded bytes are additionally memoized on (format, payload, ec, box_size, border).
+
+qrcode (which pulls in PIL) and NumPy are imported on first use, not at module load:
+a host_only worker never renders a QR and should not pay for them at boot.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import importlib
+import importlib.util
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+import metrics
+
+# Module objects once loaded; False = tried and not installed.
+_qrcode: Any = None
+_np: Any = None
+
+
+DEFAULT_ERROR_CORRECTION = "M"
+DEFAULT_BOX_SIZE = 10
+DEFAULT_BORDER = 4
+
+FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+ERROR_CORRECTION_LEVELS = ("L", "M", "Q", "H")
+MAX_BOX_SIZE = 40
+MAX_BORDER = 16
+
+_CACHE_MAX_ENTRIES = 64
+
+Matrix = Tuple[Tuple[bool, ...], ...]
+
+_cache_lock = threading.Lock()
+_cache: "OrderedDict[Tuple[str, str, str, int, int], Tuple[bytes, str]]" = OrderedDict()
+
+
+def _optional_module(name: str) -> Any:
+    try:
+        return importlib.import_module(name)
+    except ModuleNotFoundError:  # pragma: no cover
+        return False
+
+
+def _load_qrcode() -> Any:
+    global _qrcode
+    if _qrcode is None:
+        _qrcode = _optional_module("qrcode")
+    return _qrcode or None
+
+
+def _load_numpy() -> Any:
+    global _np
+    if _np is None:
+        _np = _optional_module("numpy")
+    return _np or None
+
+
+def available() -> bool:
+    """
+    Whether qrcode is installed (checked without importing it).
+    """
+    if _qrcode is not None:
+        return bool(_qrcode)
+    return importlib.util.find_spec("qrcode") is not None
+
+
+def has_numpy() -> bool:
+    return _load_numpy() is not None
+
+
+def _error_correction_constant(qrcode: Any, level: str) -> int:
+    return {
+        "L": qrcode.constants.ERROR_CORRECT_L,
+        "M": qrcode.constants.ERROR_CORRECT_M,
+        "Q": qrcode.constants.ERROR_CORRECT_Q,
+        "H": qrcode.constants.ERROR_CORRECT_H,
+    }[level]
+
+
+def _require_qrcode() -> Any:
+    qrcode = _load_qrcode()
+    if qrcode is None:
+        raise RuntimeError(
+            "QR üretimi için paket eksik: 'qrcode'. "
+            "Kurulum: pip install -r requirements.txt"
+        )
+    return qrcode
+
+
+def normalize_options(
+    fmt: Optional[Any] = None,
+    error_correction: Optional[Any] = None,
+    box_size: Optional[Any] = None,
+    border: Optional[Any] = None,
+) -> Tuple[str, str, int, int]:
+    """
+    Validates user-supplied render options (query string, config, CLI).
+    Unknown / unparseable values fall back to the defaults; sizes are clamped.
+    """
+    fmt_s = str(fmt or "png").strip().lower()
+    if fmt_s not in FORMATS:
+        fmt_s = "png"
+    ec = str(error_correction or DEFAULT_ERROR_CORRECTION).strip().upper()
+    if ec not in ERROR_CORRECTION_LEVELS:
+        ec = DEFAULT_ERROR_CORRECTION
+
+    def _int(value: Optional[Any], default: int, lo: int, hi: int) -> int:
+        try:
+            n = int(value) if value is not None and str(value).strip() != "" else default
+        except (TypeError, ValueError):
+            n = default
+        return max(lo, min(hi, n))
+
+    return (
+        fmt_s,
+        ec,
+        _int(box_size, DEFAULT_BOX_SIZE, 1, MAX_BOX_SIZE),
+        _int(border, DEFAULT_BORDER, 0, MAX_BORDER),
+    )
+
+
+@functools.lru_cache(maxsize=256)
+@metrics.timed("qr_make")  # inside the cache: only misses are timed
+def qr_matrix(payload: str, error_correction: str = DEFAULT_ERROR_CORRECTION) -> Matrix:
+    """
+    Boolean module matrix (True = dark), without the quiet zone.
+    Memoized: re-rendering at another size or format skips version/mask selection.
+    """
+    qrcode = _require_qrcode()
+    qr = qrcode.QRCode(
+        version=None,
+        error_correction=_error_correction_constant(qrcode, error_correction),
+        border=0,
+    )
+    qr.add_data(payload)
+    qr.make(fit=True)
+    return tuple(tuple(bool(m) for m in row) for row in qr.modules)
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def _raster_rows_numpy(np: Any, matrix: Matrix, box_size: int, border: int) -> bytes:
+    light = ~np.pad(np.array(matrix, dtype=bool), border, constant_values=False)
+    pixels = np.repeat(np.repeat(light, box_size, axis=0), box_size, axis=1)
+    packed = np.packbits(pixels, axis=1)
+    # Each scanline starts with filter type 0 (None).
+    return np.hstack([np.zeros((packed.shape[0], 1), dtype=np.uint8), packed]).tobytes()
+
+
+def _raster_rows_python(matrix: Matrix, box_size: int, border: int) -> bytes:
+    size = len(matrix) + 2 * border
+    width = size * box_size
+    row_bytes = (width + 7) // 8
+    pad_bits = row_bytes * 8 - width
+    # Padding bits past `width` are 0, as np.packbits leaves them: both rasterizers
+    # must produce identical bytes (the ETag and store keys are hashes of them).
+    blank = b"\x00" + int("1" * width + "0" * pad_bits, 2).to_bytes(row_bytes, "big")
+    out = []
+    out.append(blank * (border * box_size))
+    for row in matrix:
+        bits = "1" * (border * box_size)
+        bits += "".join(("0" if m else "1") * box_size for m in row)
+        bits += "1" * (border * box_size) + "0" * pad_bits
+        line = b"\x00" + int(bits, 2).to_bytes(row_bytes, "big")
+        out.append(line * box_size)
+    out.append(blank * (border * box_size))
+    return b"".join(out)
+
+
+def rasterize_png(matrix: Matrix, box_size: int = DEFAULT_BOX_SIZE, border: int = DEFAULT_BORDER) -> bytes:
+    """
+    Encodes `matrix` as a 1-bit grayscale PNG (box_size px per module, `border` modules of quiet zone).
+    """
+    width = (len(matrix) + 2 * border) * box_size
+    t0 = time.perf_counter()
+    np = _load_numpy()
+    if np is not None:
+        raw = _raster_rows_numpy(np, matrix, box_size, border)
+    else:
+        raw = _raster_rows_python(matrix, box_size, border)
+    t1 = time.perf_counter()
+    png = b"".join(
+        [
+            b"\x89PNG\r\n\x1a\n",
+            _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, width, 1, 0, 0, 0, 0)),
+            _png_chunk(b"IDAT", zlib.compress(raw, 6)),
+            _png_chunk(b"IEND", b""),
+        ]
+    )
+    metrics.observe_op("qr_rasterize", t1 - t0)
+    metrics.observe_op("qr_encode", time.perf_counter() - t1)
+    return png
+
+
+def _render_png(payload: str, error_correction: str, box_size: int, border: int) -> bytes:
+    return rasterize_png(qr_matrix(payload, error_correction), box_size, border)
+
+
+def _render_svg(payload: str, error_correction: str, box_size: int, border: int) -> bytes:
+    """
+    SVG straight from the module matrix: one path, one horizontal run per subpath.
+    Coordinates are in modules (viewBox), so the output size is independent of box_size.
+    """
+    modules = qr_matrix(payload, error_correction)
+    t0 = time.perf_counter()
+    n = len(modules)
+    size = n + 2 * border
+    parts = []
+    for y, row in enumerate(modules):
+        x = 0
+        while x < n:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < n and row[x]:
+                x += 1
+            parts.append(f"M{start + border} {y + border}h{x - start}v1h-{x - start}z")
+    px = size * box_size
+    svg = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{px}" height="{px}" '
+        f'viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/>'
+        f'<path fill="#000" d="{"".join(parts)}"/></svg>\n'
+    )
+    data = svg.encode("ascii")
+    metrics.observe_op("qr_encode", time.perf_counter() - t0)
+    return data
+
+
+_RENDERERS = {"png": _render_png, "svg": _render_svg}
+
+
+def render(
+    payload: str,
+    fmt: str = "png",
+    error_correction: str = DEFAULT_ERROR_CORRECTION,
+    box_size: int = DEFAULT_BOX_SIZE,
+    border: int = DEFAULT_BORDER,
+) -> Tuple[bytes, str]:
+    """
+    Returns (image_bytes, etag) for the QR of `payload` in `fmt` ("png" | "svg").
+    - Served from a bounded LRU keyed on (fmt, payload, error_correction, box_size, border)
+    - etag is a strong validator (sha256 of the bytes, unquoted)
+    """
+    key = (fmt, payload, error_correction, box_size, border)
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None:
+            _cache.move_to_end(key)
+            return hit
+
+    data = _RENDERERS[fmt](payload, error_correction, box_size, border)
+    entry = (data, hashlib.sha256(data).hexdigest()[:32])
+    with _cache_lock:
+        _cache[key] = entry
+        _cache.move_to_end(key)
+        while len(_cache) > _CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return entry
+
+
+def render_png(
+    payload: str,
+    error_correction: str = DEFAULT_ERROR_CORRECTION,
+    box_size: int = DEFAULT_BOX_SIZE,
+    border: int = DEFAULT_BORDER,
+) -> Tuple[bytes, str]:
+    return render(payload, "png", error_correction, box_size, border)
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+    qr_matrix.cache_clear()
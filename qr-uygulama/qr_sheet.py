@@ -0,0 +1,136 @@
+"""
+Printable A4 sheets of labelled QR codes, streamed as a PDF.
+
+QR codes are drawn as vector rectangles straight from the module matrix, one page
+at a time, so memory stays flat no matter how many codes the sheet has (only the
+per-object byte offsets are kept for the xref table).
+"""
+
+from __future__ import annotations
+
+import itertools
+import zlib
+from typing import Iterable, Iterator, List, Tuple
+
+import qr_render
+
+
+A4_WIDTH = 595.28
+A4_HEIGHT = 841.89
+MARGIN = 28.0
+LABEL_HEIGHT = 14.0
+LABEL_FONT_SIZE = 9
+
+MAX_COLS = 10
+MAX_ROWS = 14
+
+_TR_ASCII = str.maketrans("şŞğĞıİ", "sSgGiI")
+
+
+def _pdf_text(label: str) -> bytes:
+    # Built-in Helvetica/WinAnsi has no ş/ğ/ı; fold them to ASCII and escape the rest.
+    raw = label.translate(_TR_ASCII).encode("cp1252", errors="replace")
+    return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _draw_qr(out: List[bytes], payload: str, ec: str, x: float, y: float, size: float) -> None:
+    # Bypass the shared matrix cache: sheets are one-shot and may hold thousands of codes.
+    matrix = qr_render.qr_matrix.__wrapped__(payload, ec)
+    n = len(matrix)
+    module = size / n
+    for row_idx, row in enumerate(matrix):
+        top = y + size - (row_idx + 1) * module
+        col = 0
+        while col < n:
+            if not row[col]:
+                col += 1
+                continue
+            start = col
+            while col < n and row[col]:
+                col += 1
+            out.append(b"%.3f %.3f %.3f %.3f re\n" % (x + start * module, top, (col - start) * module, module))
+    out.append(b"f\n")
+
+
+def _page_content(items: List[Tuple[str, str]], cols: int, rows: int, ec: str) -> bytes:
+    cell_w = (A4_WIDTH - 2 * MARGIN) / cols
+    cell_h = (A4_HEIGHT - 2 * MARGIN) / rows
+    pad = min(cell_w, cell_h) * 0.08
+    qr_size = min(cell_w - 2 * pad, cell_h - LABEL_HEIGHT - 2 * pad)
+    out: List[bytes] = [b"0 g\n"]
+    for i, (label, payload) in enumerate(items):
+        cx = MARGIN + (i % cols) * cell_w
+        cy = A4_HEIGHT - MARGIN - (i // cols + 1) * cell_h
+        qx = cx + (cell_w - qr_size) / 2
+        qy = cy + LABEL_HEIGHT + pad
+        _draw_qr(out, payload, ec, qx, qy, qr_size)
+        if label:
+            text = _pdf_text(label)
+            # Rough Helvetica width (0.5 em per glyph) is enough to center a short label.
+            tx = cx + max(pad, (cell_w - len(text) * LABEL_FONT_SIZE * 0.5) / 2)
+            out.append(b"BT /F1 %d Tf %.2f %.2f Td (%s) Tj ET\n" % (LABEL_FONT_SIZE, tx, cy + pad, text))
+    return b"".join(out)
+
+
+def iter_sheet_pdf(
+    items: Iterable[Tuple[str, str]],
+    cols: int = 3,
+    rows: int = 4,
+    error_correction: str = qr_render.DEFAULT_ERROR_CORRECTION,
+) -> Iterator[bytes]:
+    """
+    Yields a PDF (A4, cols x rows codes per page) for (label, payload) pairs.
+    `items` is consumed lazily, one page at a time.
+    """
+    cols = max(1, min(MAX_COLS, cols))
+    rows = max(1, min(MAX_ROWS, rows))
+    per_page = cols * rows
+
+    offsets = {}
+    pos = 0
+
+    def emit(chunk: bytes) -> bytes:
+        nonlocal pos
+        pos += len(chunk)
+        return chunk
+
+    def obj(num: int, body: bytes) -> bytes:
+        offsets[num] = pos
+        return emit(b"%d 0 obj\n" % num + body + b"\nendobj\n")
+
+    # 1 = catalog, 2 = page tree, 3 = font; pages take 2 objects each from 4 on.
+    yield emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    yield obj(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    kids: List[int] = []
+    next_num = 4
+    it = iter(items)
+    while True:
+        page_items = list(itertools.islice(it, per_page))
+        if not page_items and kids:
+            break
+        content = zlib.compress(_page_content(page_items, cols, rows, error_correction), 6)
+        page_num, content_num = next_num, next_num + 1
+        next_num += 2
+        yield obj(
+            content_num,
+            b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(content) + content + b"\nendstream",
+        )
+        yield obj(
+            page_num,
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (A4_WIDTH, A4_HEIGHT, content_num),
+        )
+        kids.append(page_num)
+        if len(page_items) < per_page:
+            break
+
+    yield obj(2, b"<< /Type /Pages /Count %d /Kids [%s] >>" % (len(kids), b" ".join(b"%d 0 R" % k for k in kids)))
+    yield obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+    xref_pos = pos
+    lines = [b"xref\n0 %d\n" % next_num, b"0000000000 65535 f \n"]
+    for num in range(1, next_num):
+        lines.append(b"%010d 00000 n \n" % offsets[num])
+    yield emit(b"".join(lines))
+    yield emit(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (next_num, xref_pos))
@@ -0,0 +1,245 @@
+"""
+Non-blocking scan analytics for the /r/<token> gate.
+
+- record() only appends a tuple to an in-memory ring buffer (collections.deque)
+- a background thread drains it every few seconds into an append-only binary log
+  next to the config (scans.log, or QR_SCAN_LOG_PATH); events of a failed write are
+  kept and retried first on the next flush
+- once the log reaches QR_SCAN_LOG_MAX_BYTES (16 MiB; 0 = no cap) it is renamed to
+  scans.log.1 (replacing the previous one) and a new log is started
+- summary() folds the log (all gunicorn workers append to the same file) into
+  per-token / per-hour counters, reading only the bytes added since the last call;
+  it covers the current log and scans.log.1
+
+Log record: <I ts><B outcome><B ua_class><H token_len><token bytes> (little-endian).
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import procutil
+from config_store import config_path, file_lock
+
+
+OUTCOME_HIT = 0
+OUTCOME_GONE = 1
+OUTCOME_NAMES = ("hit", "gone")
+
+UA_OTHER = 0
+UA_MOBILE = 1
+UA_DESKTOP = 2
+UA_BOT = 3
+UA_NAMES = ("other", "mobile", "desktop", "bot")
+
+RING_SIZE = 65536
+FLUSH_INTERVAL_S = 2.0
+
+_HEADER = struct.Struct("<IBBH")
+_MAX_TOKEN_BYTES = 128
+# Random tokens from bots would otherwise grow the aggregates without bound.
+MAX_TRACKED_TOKENS = 10000
+OVERFLOW_TOKEN = "(other)"
+
+_ring: Deque[Tuple[int, str, int, int]] = deque(maxlen=RING_SIZE)
+_dropped = 0
+# Encoded records of a write that failed; retried before the ring.
+_unwritten: List[bytes] = []
+_write_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return (os.getenv("QR_SCAN_ANALYTICS") or "1").strip() not in ("0", "false", "off")
+
+
+def max_log_bytes() -> int:
+    try:
+        return max(0, int(os.getenv("QR_SCAN_LOG_MAX_BYTES") or 16 * 1024 * 1024))
+    except ValueError:
+        return 16 * 1024 * 1024
+
+
+def log_path() -> str:
+    env_path = (os.getenv("QR_SCAN_LOG_PATH") or "").strip()
+    if env_path:
+        return env_path
+    return os.path.join(os.path.dirname(config_path()) or ".", "scans.log")
+
+
+def classify_user_agent(ua: str) -> int:
+    ua = ua.lower()
+    if not ua:
+        return UA_OTHER
+    if "bot" in ua or "spider" in ua or "crawl" in ua or "curl" in ua or "python" in ua:
+        return UA_BOT
+    if "mobi" in ua or "android" in ua or "iphone" in ua or "ipad" in ua:
+        return UA_MOBILE
+    if "windows" in ua or "macintosh" in ua or "x11" in ua:
+        return UA_DESKTOP
+    return UA_OTHER
+
+
+def record(token: str, hit: bool, user_agent: str) -> None:
+    """
+    Called on the gate's hot path: O(1), no I/O, no locks.
+    """
+    global _dropped
+    if not enabled():
+        return
+    if _FLUSHER.pid != os.getpid():
+        _FLUSHER.start()
+    if len(_ring) == RING_SIZE:
+        _dropped += 1
+    _ring.append((int(time.time()), token, OUTCOME_HIT if hit else OUTCOME_GONE, classify_user_agent(user_agent)))
+
+
+def _encode(ts: int, token: str, outcome: int, ua_class: int) -> bytes:
+    raw = token.encode("utf-8")[:_MAX_TOKEN_BYTES]
+    return _HEADER.pack(ts, outcome, ua_class, len(raw)) + raw
+
+
+def _rotate_if_full(path: str) -> None:
+    limit = max_log_bytes()
+    if not limit:
+        return
+    try:
+        if os.path.getsize(path) < limit:
+            return
+    except OSError:
+        return
+    # Re-checked under the lock: only one worker renames, the others append to the new file.
+    with file_lock(path):
+        try:
+            if os.path.getsize(path) >= limit:
+                os.replace(path, path + ".1")
+        except OSError:
+            pass
+
+
+def flush() -> int:
+    """
+    Drains the ring buffer into the log in a single append. Returns events written.
+    On OSError the batch is kept (up to RING_SIZE events) and the error re-raised.
+    """
+    global _unwritten, _dropped
+    with _write_lock:
+        batch = _unwritten
+        _unwritten = []
+        try:
+            while True:
+                batch.append(_encode(*_ring.popleft()))
+        except IndexError:
+            pass
+        if not batch:
+            return 0
+        path = log_path()
+        try:
+            parent = os.path.dirname(path)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            _rotate_if_full(path)
+            # One O_APPEND write per batch keeps records from different workers whole.
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, b"".join(batch))
+            finally:
+                os.close(fd)
+        except OSError:
+            if len(batch) > RING_SIZE:
+                _dropped += len(batch) - RING_SIZE
+                batch = batch[-RING_SIZE:]
+            _unwritten = batch
+            raise
+        return len(batch)
+
+
+# A failed flush() keeps its batch, so the next round writes it.
+_FLUSHER = procutil.ProcessDaemon("scan-analytics-flush", procutil.every(FLUSH_INTERVAL_S, flush))
+
+
+# Aggregates folded from the log, shared by summary() calls in this process.
+_agg_lock = threading.Lock()
+_agg_offset = 0
+_agg_tail = b""
+_agg_inode: Optional[int] = None
+_agg_tokens: Dict[str, Dict[str, Any]] = {}
+
+
+def _fold(ts: int, token: str, outcome: int, ua_class: int) -> None:
+    entry = _agg_tokens.get(token)
+    if entry is None and len(_agg_tokens) >= MAX_TRACKED_TOKENS:
+        token = OVERFLOW_TOKEN
+        entry = _agg_tokens.get(token)
+    if entry is None:
+        entry = {"hit": 0, "gone": 0, "user_agents": [0] * len(UA_NAMES), "hours": {}}
+        _agg_tokens[token] = entry
+    entry[OUTCOME_NAMES[outcome]] += 1
+    entry["user_agents"][ua_class] += 1
+    hour = ts - ts % 3600
+    counts = entry["hours"].setdefault(hour, [0, 0])
+    counts[outcome] += 1
+
+
+def _fold_records(data: bytes) -> bytes:
+    # Returns the trailing partial record (still being appended).
+    pos = 0
+    while pos + _HEADER.size <= len(data):
+        ts, outcome, ua_class, n = _HEADER.unpack_from(data, pos)
+        end = pos + _HEADER.size + n
+        if end > len(data):
+            break
+        token = data[pos + _HEADER.size : end].decode("utf-8", errors="replace")
+        if outcome < len(OUTCOME_NAMES) and ua_class < len(UA_NAMES):
+            _fold(ts, token, outcome, ua_class)
+        pos = end
+    return data[pos:]
+
+
+def summary(hours: int = 48) -> Dict[str, Any]:
+    """
+    Per-token totals, user-agent classes and per-hour hit/gone counters (last `hours`),
+    across all workers. "pending" / "dropped" describe this worker's ring buffer only.
+    """
+    global _agg_offset, _agg_tail, _agg_inode
+    path = log_path()
+    with _agg_lock:
+        try:
+            st = os.stat(path)
+            size, inode = st.st_size, st.st_ino
+        except OSError:
+            size, inode = 0, None
+        if inode != _agg_inode or size < _agg_offset:
+            # First call, log rotated or truncated: start over from scans.log.1 + the new log.
+            _agg_offset, _agg_tail, _agg_inode = 0, b"", inode
+            _agg_tokens.clear()
+            try:
+                with open(path + ".1", "rb") as f:
+                    _fold_records(f.read())
+            except OSError:
+                pass
+        if size > _agg_offset:
+            with open(path, "rb") as f:
+                f.seek(_agg_offset)
+                data = _agg_tail + f.read(size - _agg_offset)
+            _agg_offset = size
+            _agg_tail = _fold_records(data)
+
+        since = int(time.time()) - hours * 3600
+        tokens = {}
+        for token, entry in _agg_tokens.items():
+            tokens[token] = {
+                "hit": entry["hit"],
+                "gone": entry["gone"],
+                "user_agents": dict(zip(UA_NAMES, entry["user_agents"])),
+                "hours": {
+                    time.strftime("%Y-%m-%dT%H:00Z", time.gmtime(h)): {"hit": c[0], "gone": c[1]}
+                    for h, c in sorted(entry["hours"].items())
+                    if h >= since
+                },
+            }
+    return {"tokens": tokens, "pending": len(_ring) + len(_unwritten), "dropped": _dropped}
@@ -0,0 +1,287 @@
+"""
+Keep-alive client for pushing state to the hosted instance(s).
+
+One persistent HTTP(S) connection per (host, admin token) is reused across calls,
+so consecutive pushes (info + rotation, startup + later syncs) pay the TCP/TLS
+handshake once instead of once per request. fan_out() pushes to several replicas
+concurrently, each with its own retries and jittered exponential backoff.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import http.client
+import json
+import random
+import ssl
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import metrics
+
+
+DEFAULT_TIMEOUT_S = 15.0
+DEFAULT_RETRIES = 3
+BACKOFF_BASE_S = 0.5
+BACKOFF_MAX_S = 8.0
+
+# Worth retrying: the host may be restarting / cold-starting (Render) or rate limiting.
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class SyncError(RuntimeError):
+    def __init__(self, status: int, body: str) -> None:
+        super().__init__(f"HTTP {status}: {body[:200]}")
+        self.status = status
+        self.body = body
+
+
+class SyncClient:
+    def __init__(self, base_url: str, admin_token: str, timeout: float = DEFAULT_TIMEOUT_S) -> None:
+        parts = urllib.parse.urlsplit(base_url.strip().rstrip("/"))
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise RuntimeError(f"Geçersiz remote_base_url: {base_url!r}")
+        self.base_url = base_url.strip().rstrip("/")
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip("/")
+        self.admin_token = admin_token
+        self.timeout = timeout
+        self._conn: Optional[http.client.HTTPConnection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(
+                self.host, self.port, timeout=self.timeout, context=ssl.create_default_context()
+            )
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _request(self, method: str, path: str, body: Optional[bytes], headers: Dict[str, str]) -> Tuple[int, bytes]:
+        reused = self._conn is not None
+        if self._conn is None:
+            self._conn = self._connect()
+        try:
+            self._conn.request(method, self.prefix + path, body=body, headers=headers)
+            resp = self._conn.getresponse()
+            data = resp.read()
+            if resp.will_close:
+                self.close()
+            return resp.status, data
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError, http.client.CannotSendRequest):
+            self.close()
+            if not reused:
+                raise
+            # The server dropped an idle keep-alive connection: retry once on a fresh one.
+            self._conn = self._connect()
+            self._conn.request(method, self.prefix + path, body=body, headers=headers)
+            resp = self._conn.getresponse()
+            data = resp.read()
+            if resp.will_close:
+                self.close()
+            return resp.status, data
+        except BaseException:
+            self.close()
+            raise
+
+    @metrics.timed("sync_post")
+    def post_json(
+        self, path: str, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """
+        POSTs `payload` as JSON; returns the decoded JSON reply.
+        A 304 (If-None-Match: the host already has this state) returns {"ok": True, "unchanged": True}.
+        Raises SyncError on other non-2xx responses.
+        """
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        headers = {
+            **(headers or {}),
+            "Content-Type": "application/json; charset=utf-8",
+            "Authorization": f"Bearer {self.admin_token}",
+        }
+        with self._lock:
+            status, data = self._request("POST", path, body, headers)
+        if status == 304:
+            return {"ok": True, "unchanged": True}
+        if not 200 <= status < 300:
+            raise SyncError(status, data.decode("utf-8", errors="replace"))
+        try:
+            return json.loads(data or b"{}")
+        except ValueError:
+            return {}
+
+    def close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            conn.close()
+
+
+_clients: Dict[Tuple[str, str], SyncClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(base_url: str, admin_token: str, timeout: float = DEFAULT_TIMEOUT_S) -> SyncClient:
+    """
+    Shared client for this host/token (created on first use, connection kept alive).
+    """
+    key = (base_url.strip().rstrip("/"), admin_token)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = SyncClient(key[0], admin_token, timeout)
+            _clients[key] = client
+        client.timeout = timeout
+        return client
+
+
+def close_all() -> None:
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+def part_etag(part: Dict[str, Any]) -> str:
+    """
+    Content hash of one synced part ("info" or "rotate" fields); computed identically
+    by the pushing side (from its payload) and the host (from its config).
+    """
+    raw = json.dumps(part, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def state_etag(part_etags: Dict[str, str]) -> str:
+    """
+    ETag of a set of parts, e.g. {"info": part_etag(...), "rotate": part_etag(...)}.
+    """
+    raw = "&".join(f"{kind}={part_etags[kind]}" for kind in sorted(part_etags))
+    return hashlib.sha256(raw.encode("ascii")).hexdigest()[:32]
+
+
+def clients_for_config(cfg: Dict[str, Any]) -> List[SyncClient]:
+    """
+    One client per hosted replica. remote_base_url may be a single URL, a list of URLs,
+    or a list of {"url": ..., "admin_token": ..., "timeout_s": ...} overrides.
+    """
+    raw = cfg.get("remote_base_url")
+    entries = raw if isinstance(raw, list) else [raw]
+    default_token = (cfg.get("remote_admin_token") or "").strip()
+    default_timeout = float(cfg.get("remote_timeout_s") or DEFAULT_TIMEOUT_S)
+    clients = []
+    for entry in entries:
+        if isinstance(entry, dict):
+            base = str(entry.get("url") or "").strip().rstrip("/")
+            token = str(entry.get("admin_token") or "").strip() or default_token
+            timeout = float(entry.get("timeout_s") or default_timeout)
+        else:
+            base = str(entry or "").strip().rstrip("/")
+            token, timeout = default_token, default_timeout
+        if not base:
+            continue
+        if not token:
+            raise RuntimeError("remote_base_url veya remote_admin_token eksik.")
+        clients.append(get_client(base, token, timeout))
+    if not clients:
+        raise RuntimeError("remote_base_url veya remote_admin_token eksik.")
+    return clients
+
+
+def retries_for_config(cfg: Dict[str, Any]) -> int:
+    value = cfg.get("remote_retries")
+    return DEFAULT_RETRIES if value is None else max(0, int(value))
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """
+    Full jitter: uniform in [0, min(max_delay, base_delay * 2**(attempt-1))].
+    """
+    return random.uniform(0, min(max_delay, base_delay * (2 ** (max(1, attempt) - 1))))
+
+
+class FanOutError(RuntimeError):
+    """
+    Raised when at least one host failed; .results has the per-host report.
+    """
+
+    def __init__(self, results: List[Dict[str, Any]]) -> None:
+        failed = [r for r in results if not r["ok"]]
+        detail = "; ".join(f"{r['host']}: {r['error']}" for r in failed)
+        super().__init__(f"{len(failed)}/{len(results)} host başarısız: {detail}")
+        self.results = results
+
+
+def _retryable(exc: BaseException) -> bool:
+    if isinstance(exc, SyncError):
+        return exc.status in RETRYABLE_STATUSES
+    return isinstance(exc, (OSError, http.client.HTTPException))
+
+
+def push_with_retry(
+    client: SyncClient,
+    push: Callable[[SyncClient], Optional[bool]],
+    retries: int = DEFAULT_RETRIES,
+    base_delay: float = BACKOFF_BASE_S,
+    max_delay: float = BACKOFF_MAX_S,
+) -> Dict[str, Any]:
+    """
+    Runs push(client) up to 1 + retries times with full-jitter exponential backoff.
+    push() may return True to report that nothing had to be sent.
+    Returns {"host", "ok", "unchanged", "attempts", "elapsed_ms", "status", "error"}.
+    """
+    started = time.perf_counter()
+    attempt = 0
+    error: Optional[str] = None
+    status: Optional[int] = None
+    unchanged = False
+    while True:
+        attempt += 1
+        try:
+            unchanged = bool(push(client))
+            error = status = None
+            break
+        except Exception as e:
+            error = repr(e)
+            status = getattr(e, "status", None)
+            if attempt > retries or not _retryable(e):
+                break
+            time.sleep(backoff_delay(attempt, base_delay, max_delay))
+    return {
+        "host": client.base_url,
+        "ok": error is None,
+        "unchanged": unchanged,
+        "attempts": attempt,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        "status": status,
+        "error": error,
+    }
+
+
+def fan_out(
+    clients: List[SyncClient],
+    push: Callable[[SyncClient], Optional[bool]],
+    retries: int = DEFAULT_RETRIES,
+) -> List[Dict[str, Any]]:
+    """
+    Runs push() against every host concurrently; total time is that of the slowest
+    host, not the sum. Results are in the order of `clients`.
+    """
+    if len(clients) == 1:
+        return [push_with_retry(clients[0], push, retries)]
+    with ThreadPoolExecutor(max_workers=len(clients), thread_name_prefix="sync-fanout") as pool:
+        futures = [pool.submit(push_with_retry, c, push, retries) for c in clients]
+        return [f.result() for f in futures]
+
+
+def format_report(results: List[Dict[str, Any]]) -> List[str]:
+    lines = []
+    for r in results:
+        status = ("OK (değişiklik yok)" if r.get("unchanged") else "OK") if r["ok"] else "FAILED"
+        line = f"{r['host']}: {status} ({r['attempts']} deneme, {r['elapsed_ms']:.0f} ms)"
+        if r["error"]:
+            line += f" {r['error']}"
+        lines.append(line)
+    return lines
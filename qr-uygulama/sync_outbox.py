@@ -0,0 +1,252 @@
+"""
+Durable outbox for remote syncs that did not reach every host.
+
+- entries live in a JSON file next to the config (sync_outbox.json, or
+  QR_SYNC_OUTBOX_PATH), so a failed rotation survives restarts
+- one entry per kind ("info", "rotate"): queuing a newer rotation replaces the pending
+  one, so a superseded token is never sent; a rotation whose token is no longer the
+  local active_qr_token is dropped when drained
+- each entry keeps the hosts that still need it and one Idempotency-Key, reused on
+  every retry of that entry
+- a per-process daemon thread drains due entries with full-jitter exponential backoff
+- sync_acked.json (QR_SYNC_ACKED_PATH) remembers, per host, the content hash of each
+  part that host last acknowledged, so unchanged parts are not pushed again
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import secrets
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import procutil
+import sync_client
+from config_store import config_path, file_lock, load_config, update_config, write_json_atomic
+
+
+ENDPOINTS = {"info": "/api/config", "rotate": "/api/rotate"}
+
+BACKOFF_BASE_S = 2.0
+BACKOFF_MAX_S = 300.0
+IDLE_POLL_S = 60.0
+
+_wake = threading.Event()
+
+
+def outbox_path() -> str:
+    env_path = (os.getenv("QR_SYNC_OUTBOX_PATH") or "").strip()
+    if env_path:
+        return env_path
+    return os.path.join(os.path.dirname(config_path()) or ".", "sync_outbox.json")
+
+
+def _read() -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(outbox_path(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _write(entries: Dict[str, Dict[str, Any]]) -> None:
+    path = outbox_path()
+    if entries:
+        write_json_atomic(path, entries)
+    else:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def acked_path() -> str:
+    env_path = (os.getenv("QR_SYNC_ACKED_PATH") or "").strip()
+    if env_path:
+        return env_path
+    return os.path.join(os.path.dirname(config_path()) or ".", "sync_acked.json")
+
+
+def acked_etags() -> Dict[str, Dict[str, str]]:
+    """
+    {host base_url: {"info"|"rotate": part_etag last acknowledged by that host}}
+    """
+    try:
+        with open(acked_path(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def record_acked(host: str, part_etags: Dict[str, str]) -> None:
+    path = acked_path()
+    with file_lock(path):
+        data = acked_etags()
+        data.setdefault(host, {}).update(part_etags)
+        write_json_atomic(path, data)
+
+
+def enqueue(kind: str, payload: Dict[str, Any], hosts: List[str]) -> None:
+    """
+    Queues `payload` for `hosts`, replacing any pending entry of the same kind.
+    """
+    if kind not in ENDPOINTS:
+        raise ValueError(f"unknown outbox kind: {kind!r}")
+    path = outbox_path()
+    with file_lock(path):
+        entries = _read()
+        entries[kind] = {
+            "id": secrets.token_hex(16),
+            "payload": payload,
+            "hosts": sorted(set(hosts)),
+            "attempts": 0,
+            "created_at": time.time(),
+            # The caller has just retried in-line; give the host a moment first.
+            "next_attempt_at": time.time() + BACKOFF_BASE_S,
+            "last_error": None,
+        }
+        _write(entries)
+    start()
+
+
+def discard(kind: str) -> None:
+    """
+    Drops the pending entry of this kind (a newer push reached every host).
+    """
+    path = outbox_path()
+    if not os.path.exists(path):
+        return
+    with file_lock(path):
+        entries = _read()
+        if entries.pop(kind, None) is not None:
+            _write(entries)
+
+
+def stats(include_errors: bool = False) -> Dict[str, Any]:
+    """
+    Counts and timestamps only, unless include_errors: last_error carries host URLs
+    and response bodies, so it is for authenticated callers (/status/sync).
+    """
+    entries = _read() if os.path.exists(outbox_path()) else {}
+    now = time.time()
+    out = {
+        "depth": len(entries),
+        "pending_hosts": sum(len(e.get("hosts") or ()) for e in entries.values()),
+        "oldest_age_s": round(now - min(e["created_at"] for e in entries.values()), 1) if entries else None,
+        "next_attempt_at": min(e["next_attempt_at"] for e in entries.values()) if entries else None,
+    }
+    if include_errors:
+        out["last_error"] = next((e["last_error"] for e in entries.values() if e.get("last_error")), None)
+    return out
+
+
+def _superseded(kind: str, entry: Dict[str, Any], cfg: Dict[str, Any]) -> bool:
+    if kind != "rotate":
+        return False
+    # Payload "current_qr_token" is the local active_qr_token at the time it was queued.
+    return entry["payload"].get("current_qr_token") != (cfg.get("active_qr_token") or "").strip()
+
+
+def drain(force: bool = False) -> int:
+    """
+    Sends every due entry (all entries if force) to the hosts still missing it.
+    Returns the number of entries that completed.
+    """
+    path = outbox_path()
+    if not os.path.exists(path):
+        return 0
+    cfg = load_config()
+    now = time.time()
+    done = 0
+    for kind, entry in _read().items():
+        if kind not in ENDPOINTS or (not force and entry.get("next_attempt_at", 0) > now):
+            continue
+        if _superseded(kind, entry, cfg):
+            _apply(kind, entry["id"], acked=entry["hosts"], error=None)
+            continue
+        try:
+            clients = [c for c in sync_client.clients_for_config(cfg) if c.base_url in entry["hosts"]]
+        except RuntimeError as e:
+            _apply(kind, entry["id"], acked=[], error=repr(e))
+            continue
+        # Hosts removed from remote_base_url since the entry was queued no longer need it.
+        gone = [h for h in entry["hosts"] if h not in {c.base_url for c in clients}]
+        etag = sync_client.part_etag(entry["payload"])
+        headers = {
+            "Idempotency-Key": entry["id"],
+            "If-None-Match": '"%s"' % sync_client.state_etag({kind: etag}),
+        }
+        endpoint = ENDPOINTS[kind]
+        results = sync_client.fan_out(
+            clients, lambda client: client.post_json(endpoint, entry["payload"], headers), retries=0
+        ) if clients else []
+        for r in results:
+            if r["ok"]:
+                record_acked(r["host"], {kind: etag})
+        acked = gone + [r["host"] for r in results if r["ok"]]
+        error = next((r["error"] for r in results if not r["ok"]), None)
+        if _apply(kind, entry["id"], acked=acked, error=error):
+            done += 1
+            if kind == "rotate":
+                update_config({"last_sent_qr_token": entry["payload"]["current_qr_token"]})
+    return done
+
+
+def _apply(kind: str, entry_id: str, acked: List[str], error: Optional[str]) -> bool:
+    """
+    Records a drain attempt; returns True if the entry is now complete. An entry
+    replaced by enqueue() meanwhile is left alone.
+    """
+    with file_lock(outbox_path()):
+        entries = _read()
+        entry = entries.get(kind)
+        if entry is None or entry["id"] != entry_id:
+            return False
+        entry["hosts"] = [h for h in entry["hosts"] if h not in acked]
+        if not entry["hosts"]:
+            del entries[kind]
+            _write(entries)
+            return True
+        entry["attempts"] += 1
+        entry["last_error"] = error
+        entry["next_attempt_at"] = time.time() + sync_client.backoff_delay(
+            entry["attempts"], BACKOFF_BASE_S, BACKOFF_MAX_S
+        )
+        _write(entries)
+        return False
+
+
+def _next_due_in() -> float:
+    entries = _read() if os.path.exists(outbox_path()) else {}
+    if not entries:
+        return IDLE_POLL_S
+    due = min(e.get("next_attempt_at", 0) for e in entries.values())
+    return max(0.0, min(IDLE_POLL_S, due - time.time()))
+
+
+def _drain_loop() -> None:
+    while True:
+        _wake.wait(_next_due_in())
+        _wake.clear()
+        try:
+            drain()
+        except Exception:
+            # Never let the drainer die; the entry stays queued for the next round.
+            time.sleep(BACKOFF_BASE_S)
+
+
+_DRAINER = procutil.ProcessDaemon("sync-outbox-drain", _drain_loop)
+
+
+def start() -> None:
+    """
+    Starts (once per process) the background drainer and wakes it up.
+    """
+    _DRAINER.start()
+    _wake.set()
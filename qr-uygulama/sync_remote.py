@@ -1,14 +1,32 @@
+import argparse
+import sys
+
 from config_store import load_config
-from app import sync_info_to_remote, sync_rotate_to_remote
+from app import print_sync_outcome, sync_all_to_remote
 
 
-def main() -> None:
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Bilgileri ve aktif QR token'ını host'a gönder")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="değişmemiş olsa da gönder; host'ta başka yerden yapılan değişikliğin üzerine yaz",
+    )
+    args = parser.parse_args(argv)
     cfg = load_config()
-    sync_info_to_remote(cfg)
-    sync_rotate_to_remote(cfg)
-    print("OK: Bilgiler host'a gönderildi.")
+    if not (cfg.get("remote_sync_enabled") or cfg.get("remote_rotate_enabled")):
+        print("Remote sync kapalı (remote_sync_enabled / remote_rotate_enabled): gönderilecek bir şey yok.")
+        return 0
+    try:
+        results = sync_all_to_remote(cfg, force=args.force)
+    except Exception as e:
+        # FanOutError (one host failed, e.g. 412) or a bad config: report, exit non-zero.
+        print_sync_outcome(cfg, None, e)
+        return 1
+    print_sync_outcome(cfg, results, None)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
 
@@ -6,22 +6,39 @@ One-shot script:
 
 This is meant to be launched by double-click (via QR-URET.bat / QR-URET.vbs),
 so it does NOT start the Flask server.
+
+The new token is minted in memory; the host push and the image render run
+concurrently, so the run takes about as long as the slower of the two. Only then,
+in this order: the token is saved to config (only if at least one host accepted it,
+when remote_rotate_enabled), then the image is written to Desktop. If no host
+accepted the rotation, nothing is saved and the previous QR stays valid.
+A per-stage timing report is printed at the end.
+
+Optional image options (default: config.json qr_output_format / qr_error_correction /
+qr_box_size / qr_border):
+  --format png|svg  --ec L|M|Q|H  --box-size N  --border N
 """
 
 from __future__ import annotations
 
+import argparse
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from config_store import load_config
+import qr_render
+import sync_outbox
+from config_store import load_config, update_config
 
 try:
     # Reuse existing logic (rotation token + save-to-desktop).
     from app import (  # type: ignore
-        _rotate_active_qr_token,
-        _qr_payload_for_saved_png,
-        save_qr_png_to_desktop,
-        sync_info_to_remote,
-        sync_rotate_to_remote,
+        new_qr_token,
+        print_sync_outcome,
+        qr_payload_for_saved_png,
+        render_desktop_qr,
+        sync_all_to_remote,
+        write_desktop_qr,
     )
 except ModuleNotFoundError as e:  # pragma: no cover
     # Usually missing Flask/qrcode deps if requirements weren't installed.
@@ -31,46 +48,106 @@ except ModuleNotFoundError as e:  # pragma: no cover
     sys.exit(1)
 
 
-def main() -> int:
-    cfg = load_config()
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Yeni QR üret + host'a gönder + Masaüstüne kaydet")
+    parser.add_argument("--format", choices=["png", "svg"], default=None)
+    parser.add_argument("--ec", choices=["L", "M", "Q", "H"], default=None, help="hata düzeltme seviyesi")
+    parser.add_argument("--box-size", type=int, default=None, help="modül başına piksel")
+    parser.add_argument("--border", type=int, default=None, help="kenar boşluğu (modül)")
+    return parser.parse_args(argv)
 
-    # Explicitly create a NEW QR (this is the "generate" action).
-    _rotate_active_qr_token(cfg)
 
-    # Always print what the new QR will contain (helps debugging).
+def _timed(timings: dict, stage: str, fn, *args, **kwargs):
+    t0 = time.perf_counter()
     try:
-        payload = _qr_payload_for_saved_png(cfg)
-        print("Yeni QR içeriği:", payload)
-    except Exception as e:
-        print("QR içeriği hesaplanamadı:", repr(e))
+        return fn(*args, **kwargs)
+    finally:
+        timings[stage] = time.perf_counter() - t0
+
 
-    # Push text to host (customers see it)
+def _push(cfg: dict, timings: dict):
+    """
+    Returns (results, error); never raises (runs on a worker thread).
+    """
     try:
-        sync_info_to_remote(cfg)
-        if cfg.get("remote_sync_enabled"):
-            print("Remote sync: OK")
+        return _timed(timings, "sync", sync_all_to_remote, cfg), None
     except Exception as e:
-        if cfg.get("remote_sync_enabled"):
-            print("Remote sync: FAILED:", repr(e))
+        return getattr(e, "results", None), e
+
+
+def _print_timings(timings: dict, results: list | None, wall: float) -> None:
+    print("Süreler:")
+    for stage, secs in timings.items():
+        print(f"  {stage:<8} {secs * 1000:8.1f} ms")
+    for r in results or ():
+        print(f"    {r['host']}: {r['elapsed_ms']:.0f} ms")
+    slowest = max(timings, key=timings.get) if timings else None
+    serial = sum(timings.values())
+    print(f"  toplam   {wall * 1000:8.1f} ms (sırayla olsaydı ~{serial * 1000:.0f} ms, en yavaş: {slowest})")
 
-    # Rotate host gate token (old QR becomes invalid)
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parse_args(argv)
+    started = time.perf_counter()
+    timings: dict[str, float] = {}
+    cfg = load_config()
+
+    # Explicitly create a NEW QR (this is the "generate" action); not saved yet.
+    token = _timed(timings, "mint", new_qr_token, cfg)
+    cfg["active_qr_token"] = token
+    cfg["last_sent_qr_token"] = ""
+
+    # Always print what the new QR will contain (helps debugging).
     try:
-        sync_rotate_to_remote(cfg)
-        if cfg.get("remote_rotate_enabled"):
-            print("Remote rotate: OK")
-            print("Host'ta aktif token ayarlandı. (Token gizli)")
+        payload = qr_payload_for_saved_png(cfg)
+        print("Yeni QR içeriği:", payload)
     except Exception as e:
-        if cfg.get("remote_rotate_enabled"):
-            print("Remote rotate: FAILED:", repr(e))
+        print("QR içeriği hesaplanamadı:", repr(e))
 
-    # Generate QR png (local)
+    # Push text + new gate token to the host(s) while the image renders.
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="generate") as pool:
+        push = pool.submit(_push, cfg, timings)
+        render = pool.submit(
+            _timed, timings, "render", render_desktop_qr,
+            cfg, args.format, args.ec, args.box_size, args.border,
+        )
+        results, sync_error = push.result()
+        try:
+            out_path, data = render.result()
+            render_error = None
+        except Exception as e:
+            out_path, data, render_error = None, None, e
+
+    print_sync_outcome(cfg, results if sync_error is None else None, sync_error)
+    accepted = not cfg.get("remote_rotate_enabled") or sync_error is None or any(
+        r["ok"] for r in results or ()
+    )
+    if not accepted:
+        # No host has the new token: keep the previous one (printed QRs stay valid).
+        sync_outbox.discard("rotate")
+        print("Yeni QR kaydedilmedi: host yeni token'ı kabul etmedi. Eski QR geçerli kalıyor.")
+        _print_timings(timings, results, time.perf_counter() - started)
+        return 3
+
+    # Host accepted (or rotation is local only): now the token becomes the active one.
+    # (If only some hosts accepted, the outbox keeps retrying the others.)
+    _timed(timings, "persist", update_config, {"active_qr_token": token})
+    qr_render.clear_cache()
+    if cfg.get("remote_rotate_enabled") and sync_error is None:
+        print("Host'ta aktif token ayarlandı. (Token gizli)")
+
+    if render_error is not None:
+        print("QR PNG üretilemedi:", repr(render_error))
+        _print_timings(timings, results, time.perf_counter() - started)
+        return 2
     try:
-        out = save_qr_png_to_desktop(cfg)
+        out = _timed(timings, "write", write_desktop_qr, out_path, data)
         print("QR PNG kaydedildi:", out)
     except Exception as e:
         print("QR PNG üretilemedi:", repr(e))
         return 2
-
+    finally:
+        _print_timings(timings, results, time.perf_counter() - started)
     return 0
 
 
@@ -0,0 +1,44 @@
+"""
+Shared fixtures: every test gets its own config / token storage in tmp_path.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ADMIN_TOKEN = "test-admin"
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def storage(request, tmp_path, monkeypatch):
+    """
+    Empty config on the JSON and the SQLite backend; yields the backend name.
+    """
+    monkeypatch.setenv("QR_CONFIG_BACKEND", request.param)
+    monkeypatch.setenv("QR_CONFIG_PATH", str(tmp_path / "config.json"))
+    monkeypatch.setenv("QR_CONFIG_DB_PATH", str(tmp_path / "config.db"))
+    monkeypatch.setenv("QR_SCAN_ANALYTICS", "0")
+    monkeypatch.setenv("QR_METRICS_DIR", str(tmp_path / "metrics"))
+    monkeypatch.setenv("QR_SYNC_OUTBOX_PATH", str(tmp_path / "sync_outbox.json"))
+    monkeypatch.setenv("QR_SYNC_ACKED_PATH", str(tmp_path / "sync_acked.json"))
+    monkeypatch.setenv("ADMIN_TOKEN", ADMIN_TOKEN)
+    import config_store
+
+    config_store.invalidate_config_cache()
+    yield request.param
+    config_store.invalidate_config_cache()
+
+
+@pytest.fixture
+def client(storage):
+    import app
+
+    return app.app.test_client()
+
+
+@pytest.fixture
+def auth():
+    return {"Authorization": f"Bearer {ADMIN_TOKEN}"}
@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("a2wsgi")
+
+import asgi
+import config_store
+import gate_guard
+
+
+async def _get(path):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": path, "headers": [], "client": ("10.0.0.1", 1234)}
+    await asgi.app(scope, receive, send)
+    return sent[0]["status"], time.perf_counter()
+
+
+def test_storage_lookup_does_not_block_the_loop(storage, monkeypatch):
+    config_store.update_config({"current_qr_token": "cur", "static_redirect_url": "https://example.com"})
+    config_store.config_snapshot()
+    monkeypatch.setattr(gate_guard, "_GUARD", gate_guard.GateGuard())
+    real_check = gate_guard.check
+
+    def slow_check(token, client_ip):
+        time.sleep(0.5)  # a slow disk / locked SQLite database
+        return real_check(token, client_ip)
+
+    monkeypatch.setattr(gate_guard, "check", slow_check)
+
+    async def scenario():
+        slow = asyncio.ensure_future(_get("/r/unknown"))
+        await asyncio.sleep(0.05)
+        fast = await _get("/r/cur")
+        return fast, await slow
+
+    (fast_code, fast_done), (slow_code, slow_done) = asyncio.run(scenario())
+    assert (fast_code, slow_code) == (302, 410)
+    assert fast_done < slow_done
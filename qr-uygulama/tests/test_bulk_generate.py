@@ -0,0 +1,96 @@
+import json
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+import bulk_generate
+import config_store
+import gate
+from conftest import ADMIN_TOKEN
+
+
+@pytest.fixture
+def host(storage):
+    """
+    The Flask app served on a local port; it shares the test's token storage.
+    """
+    import app
+
+    server = make_server("127.0.0.1", 0, app.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    config_store.update_config(
+        {
+            "remote_base_url": f"http://127.0.0.1:{server.server_port}",
+            "remote_admin_token": ADMIN_TOKEN,
+            "remote_retries": 0,
+            "public_base_url": "https://qr.example",
+        }
+    )
+    yield app.app.test_client()
+    server.shutdown()
+
+
+def _run(tmp_path, rows, monkeypatch, *extra):
+    sent = []
+    real_upload = bulk_generate._upload
+
+    def spy(cfg, tokens):
+        sent.extend(t["token"] for t in tokens)
+        real_upload(cfg, tokens)
+
+    monkeypatch.setattr(bulk_generate, "_upload", spy)
+    csv_path = tmp_path / "tokens.csv"
+    csv_path.write_text("".join(f"{label},https://example.com/{label}\n" for label in rows), encoding="utf-8")
+    out = tmp_path / "bulk"
+    assert bulk_generate.main([str(csv_path), "--out", str(out), "--workers", "1", "--upload", *extra]) == 0
+    manifest = json.loads((out / "manifest.json").read_text(encoding="utf-8"))
+    return {t["label"]: t for t in manifest["tokens"]}, sent
+
+
+def test_reupload_keeps_revoked_tokens_revoked(tmp_path, host, monkeypatch, auth):
+    first, sent = _run(tmp_path, ["a", "b"], monkeypatch)
+    assert sorted(sent) == sorted(t["token"] for t in first.values())
+    assert all(t["uploaded"] for t in first.values())
+    assert gate.resolve(first["a"]["token"]) == (302, "https://example.com/a")
+
+    r = host.post("/api/tokens/revoke", json={"tokens": [first["a"]["token"]]}, headers=auth)
+    assert r.status_code == 200
+    assert gate.resolve(first["a"]["token"])[0] == 410
+
+    second, sent = _run(tmp_path, ["a", "b", "c"], monkeypatch)
+    assert second["a"]["token"] == first["a"]["token"]
+    assert sent == [second["c"]["token"]]  # only the token minted in this run
+    assert gate.resolve(first["a"]["token"]) == (410, gate.GONE_MESSAGE)
+    assert gate.resolve(second["c"]["token"]) == (302, "https://example.com/c")
+
+
+def test_ttl_applies_only_to_tokens_minted_in_the_run(tmp_path, host, monkeypatch):
+    first, _ = _run(tmp_path, ["a"], monkeypatch, "--ttl-seconds", "3600")
+    assert first["a"]["expires_at"] is not None
+
+    second, sent = _run(tmp_path, ["a", "b"], monkeypatch, "--ttl-seconds", "60")
+    assert sent == [second["b"]["token"]]
+    assert second["a"]["expires_at"] == first["a"]["expires_at"]
+    assert second["b"]["expires_at"] < first["a"]["expires_at"]
+
+    third, sent = _run(tmp_path, ["a", "b"], monkeypatch)
+    assert sent == []
+    assert third["a"]["expires_at"] == first["a"]["expires_at"]
+    assert third["b"]["expires_at"] == second["b"]["expires_at"]
+
+
+def test_print_sheet_streams_the_jsonl_manifest(tmp_path, host, monkeypatch):
+    import print_sheet
+
+    manifest, _ = _run(tmp_path, ["a", "b"], monkeypatch)
+    lines = (tmp_path / "bulk" / "manifest.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == [manifest["a"], manifest["b"]]
+
+    # Given manifest.json, the sheet is read from its .jsonl sibling, line by line.
+    (tmp_path / "bulk" / "manifest.jsonl").write_text(
+        json.dumps({"label": "only", "token": "t", "payload": "https://qr.example/r/t"}) + "\n", encoding="utf-8"
+    )
+    items = list(print_sheet._iter_items(tmp_path / "bulk" / "manifest.json"))
+    assert items == [("only", "https://qr.example/r/t")]
@@ -0,0 +1,44 @@
+import secrets
+
+import config_store
+import gate_guard
+
+
+def _guard(monkeypatch):
+    config_store.update_config({"current_qr_token": "current", "static_redirect_url": "https://example.com"})
+    guard = gate_guard.GateGuard()
+    monkeypatch.setattr(gate_guard, "_GUARD", guard)
+    return guard
+
+
+def test_flood_of_random_tokens_does_not_block_valid_tokens(storage, monkeypatch):
+    guard = _guard(monkeypatch)
+    config_store.create_qr_tokens([{"token": "poster-a", "redirect_url": "https://example.com/a", "created_at": 1}])
+
+    for i in range(1000):
+        gate_guard.check(secrets.token_urlsafe(18), f"198.51.{i // 256}.{i % 256}")
+    stats = guard.stats()
+    assert stats["rejected_global"] > 0  # the flood itself is throttled
+
+    assert gate_guard.check("poster-a", "203.0.113.7") == (302, "https://example.com/a")
+    # One carrier-NAT address: its valid scans are never charged either.
+    for _ in range(200):
+        assert gate_guard.check("poster-a", "203.0.113.8")[0] == 302
+
+
+def test_misses_are_rate_limited_per_ip(storage, monkeypatch):
+    guard = _guard(monkeypatch)
+    codes = [gate_guard.check(secrets.token_urlsafe(18), "192.0.2.1")[0] for _ in range(int(guard.ip_burst) + 5)]
+    assert codes.count(410) == int(guard.ip_burst)
+    assert codes[-1] == 429
+
+
+def test_flood_from_one_ip_stays_off_storage(storage, monkeypatch):
+    guard = _guard(monkeypatch)
+    codes = [gate_guard.check(secrets.token_urlsafe(18), "192.0.2.9")[0] for _ in range(5000)]
+    stats = guard.stats()
+    # Only the burst (plus what the bucket refills meanwhile) reaches storage.
+    assert stats["lookups"] <= guard.ip_burst + 20
+    assert stats["rejected_ip"] == codes.count(429) >= 5000 - guard.ip_burst - 20
+    # Refused guesses do not push old printed QRs out of the negative cache.
+    assert stats["negative_cache_size"] == codes.count(410)
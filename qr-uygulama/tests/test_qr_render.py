@@ -0,0 +1,21 @@
+import pytest
+
+import qr_render
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize("box_size,border", [(1, 0), (3, 1), (7, 2), (10, 4)])
+def test_rasterizers_are_byte_identical(box_size, border):
+    matrix = qr_render.qr_matrix("HTTPS://QR.EXAMPLE/R/0123456789ABCDEFGHIJKLMNOPQR")
+    assert qr_render._raster_rows_python(matrix, box_size, border) == qr_render._raster_rows_numpy(
+        np, matrix, box_size, border
+    )
+
+
+def test_png_bytes_do_not_depend_on_numpy(monkeypatch):
+    matrix = qr_render.qr_matrix("https://qr.example/r/abc")
+    with_numpy = qr_render.rasterize_png(matrix, 3, 1)
+    monkeypatch.setattr(qr_render, "_np", False)  # as if NumPy were not installed
+    assert qr_render._load_numpy() is None
+    assert qr_render.rasterize_png(matrix, 3, 1) == with_numpy
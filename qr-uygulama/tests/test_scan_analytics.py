@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+import scan_analytics
+
+
+@pytest.fixture
+def log(tmp_path, monkeypatch):
+    path = str(tmp_path / "scans.log")
+    monkeypatch.setenv("QR_SCAN_LOG_PATH", path)
+    monkeypatch.setenv("QR_SCAN_ANALYTICS", "1")
+    # No background flusher: the test drives flush() itself.
+    monkeypatch.setattr(scan_analytics._FLUSHER, "pid", os.getpid())
+    monkeypatch.setattr(scan_analytics, "_unwritten", [])
+    monkeypatch.setattr(scan_analytics, "_agg_inode", None)
+    scan_analytics._ring.clear()
+    yield path
+    scan_analytics._ring.clear()
+
+
+def _hits(token):
+    entry = scan_analytics.summary()["tokens"].get(token)
+    return entry["hit"] if entry else 0
+
+
+def test_failed_write_keeps_events(log, monkeypatch):
+    for _ in range(3):
+        scan_analytics.record("tok", True, "")
+
+    real_write = os.write
+
+    def failing_write(fd, data):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(os, "write", failing_write)
+    with pytest.raises(OSError):
+        scan_analytics.flush()
+    assert scan_analytics.summary()["pending"] == 3
+
+    monkeypatch.setattr(os, "write", real_write)
+    scan_analytics.record("tok", True, "")
+    assert scan_analytics.flush() == 4
+    assert _hits("tok") == 4
+
+
+def test_rotation_keeps_summary_totals(log, monkeypatch):
+    record_size = scan_analytics._HEADER.size + len("tok")
+    monkeypatch.setenv("QR_SCAN_LOG_MAX_BYTES", str(record_size * 5))
+    for _ in range(5):
+        scan_analytics.record("tok", True, "")
+    scan_analytics.flush()
+    assert _hits("tok") == 5
+
+    for _ in range(2):
+        scan_analytics.record("tok", False, "")
+    scan_analytics.flush()
+    assert os.path.getsize(log + ".1") == record_size * 5
+    assert os.path.getsize(log) == record_size * 2
+
+    summary = scan_analytics.summary()["tokens"]["tok"]
+    assert (summary["hit"], summary["gone"]) == (5, 2)
@@ -0,0 +1,42 @@
+import time
+
+import sync_outbox
+
+
+def _queue_failed_push():
+    sync_outbox._write(
+        {
+            "info": {
+                "id": "x",
+                "payload": {},
+                "hosts": ["https://host.example"],
+                "attempts": 2,
+                "created_at": time.time() - 30,
+                "next_attempt_at": time.time() + 10,
+                "last_error": "https://host.example: 500 secret body",
+            }
+        }
+    )
+
+
+def test_public_status_hides_sync_errors(client):
+    _queue_failed_push()
+    outbox = client.get("/status").get_json()["sync_outbox"]
+    assert outbox["depth"] == 1
+    assert "last_error" not in outbox
+    assert "host.example" not in client.get("/status").get_data(as_text=True)
+
+
+def test_sync_status_requires_bearer(client, auth):
+    _queue_failed_push()
+    assert client.get("/status/sync").status_code == 401
+    body = client.get("/status/sync", headers=auth).get_json()
+    assert body["depth"] == 1
+    assert body["last_error"] == "https://host.example: 500 secret body"
+
+
+def test_wrong_or_non_ascii_bearer_is_refused(client, auth):
+    for value in ("Bearer wrong", "Bearer tökén", "Bearer "):
+        assert client.get("/status/sync", headers={"Authorization": value}).status_code == 401
+        assert client.get("/metrics", headers={"Authorization": value}).status_code == 401
+    assert client.get("/metrics", headers=auth).status_code == 200
@@ -0,0 +1,127 @@
+"""
+Conditional sync (If-None-Match / If-Match) between the local app and a host.
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import pytest
+
+import app
+import config_store
+import sync_client
+from conftest import ADMIN_TOKEN
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def remote(storage, tmp_path):
+    """
+    A host with its own storage, in a separate process; the local config points at it.
+    """
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = dict(
+        os.environ,
+        QR_CONFIG_BACKEND="json",
+        QR_CONFIG_PATH=str(tmp_path / "host" / "config.json"),
+        QR_METRICS_DIR=str(tmp_path / "host" / "metrics"),
+        QR_SYNC_OUTBOX_PATH=str(tmp_path / "host" / "sync_outbox.json"),
+        QR_SYNC_ACKED_PATH=str(tmp_path / "host" / "sync_acked.json"),
+    )
+    code = f"import app; app.app.run(host='127.0.0.1', port={port}, threaded=True)"
+    proc = subprocess.Popen([sys.executable, "-c", code], cwd=APP_DIR, env=env, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                urllib.request.urlopen(base + "/status", timeout=1).read()
+                break
+            except OSError:
+                time.sleep(0.05)
+        config_store.update_config(
+            {
+                "remote_sync_enabled": True,
+                "remote_base_url": base,
+                "remote_admin_token": ADMIN_TOKEN,
+                "remote_retries": 0,
+                "info_title": "v1",
+            }
+        )
+        yield base
+    finally:
+        proc.terminate()
+        proc.wait(5)
+
+
+def _spy_posts(monkeypatch):
+    paths = []
+    real = sync_client.SyncClient.post_json
+
+    def post_json(self, path, payload, headers=None):
+        paths.append(path)
+        return real(self, path, payload, headers)
+
+    monkeypatch.setattr(sync_client.SyncClient, "post_json", post_json)
+    return paths
+
+
+def _host_info(base):
+    return urllib.request.urlopen(base + "/info", timeout=5).read().decode("utf-8")
+
+
+def test_unchanged_state_answers_304_without_a_write(client, auth):
+    r = client.post("/api/config", json={"info_title": "Menü"}, headers=auth)
+    assert r.status_code == 200
+    etag = r.headers["ETag"]
+    gen = config_store.config_generation()
+
+    r = client.post("/api/config", json={"info_title": "Menü"}, headers={**auth, "If-None-Match": etag})
+    assert r.status_code == 304
+    assert config_store.config_generation() == gen
+
+
+def test_stale_if_match_answers_412(client, auth):
+    r = client.post("/api/config", json={"info_title": "a"}, headers=auth)
+    stale = r.headers["ETag"]
+    client.post("/api/config", json={"info_title": "b"}, headers=auth)
+
+    r = client.post("/api/config", json={"info_title": "c"}, headers={**auth, "If-Match": stale})
+    assert r.status_code == 412
+    assert config_store.config_snapshot()["info_title"] == "b"
+
+
+def test_second_sync_of_unchanged_content_sends_nothing(remote, monkeypatch):
+    paths = _spy_posts(monkeypatch)
+    app.sync_all_to_remote(config_store.load_config())
+    assert paths == ["/api/config"]
+
+    results = app.sync_all_to_remote(config_store.load_config())
+    assert paths == ["/api/config"]  # acked hash matches: no request at all
+    assert results[0]["ok"]
+
+
+def test_host_changed_behind_our_back_gets_412_until_forced(remote, monkeypatch):
+    app.sync_all_to_remote(config_store.load_config())
+    # Someone edits the host directly (e.g. its /admin page).
+    req = urllib.request.Request(
+        remote + "/api/config",
+        data=b'{"info_title": "edited-on-host"}',
+        headers={"Content-Type": "application/json", "Authorization": f"Bearer {ADMIN_TOKEN}"},
+    )
+    urllib.request.urlopen(req, timeout=5).read()
+
+    config_store.update_config({"info_title": "v2-local"})
+    with pytest.raises(sync_client.FanOutError) as err:
+        app.sync_all_to_remote(config_store.load_config())
+    assert err.value.results[0]["status"] == 412
+    assert "edited-on-host" in _host_info(remote)
+
+    app.sync_all_to_remote(config_store.load_config(), force=True)
+    assert "v2-local" in _host_info(remote)
@@ -0,0 +1,83 @@
+import pytest
+
+import config_store
+import sync_client
+import sync_outbox
+
+A, B = "https://a.example", "https://b.example"
+
+
+@pytest.fixture
+def hosts(storage, monkeypatch):
+    """
+    Fake hosts: records each POST; hosts listed in `down` fail with a 503.
+    The background drainer is not started, the tests call drain() themselves.
+    """
+    monkeypatch.setattr(sync_outbox, "start", lambda: None)
+    config_store.update_config(
+        {"remote_base_url": [A, B], "remote_admin_token": "t", "active_qr_token": "tok-1"}
+    )
+    state = {"posts": [], "down": set()}
+
+    def post_json(self, path, payload, headers=None):
+        state["posts"].append((self.base_url, path, dict(headers or {})))
+        if self.base_url in state["down"]:
+            raise sync_client.SyncError(503, "unavailable")
+        return {"ok": True}
+
+    monkeypatch.setattr(sync_client.SyncClient, "post_json", post_json)
+    return state
+
+
+def _pending():
+    return sync_outbox._read()
+
+
+def test_newer_rotation_replaces_the_pending_one(hosts):
+    sync_outbox.enqueue("rotate", {"current_qr_token": "tok-0"}, [A])
+    first_id = _pending()["rotate"]["id"]
+    sync_outbox.enqueue("rotate", {"current_qr_token": "tok-1"}, [A, B])
+
+    entry = _pending()["rotate"]
+    assert entry["payload"] == {"current_qr_token": "tok-1"}
+    assert entry["hosts"] == [A, B]
+    assert entry["id"] != first_id
+    assert sync_outbox.stats()["depth"] == 1
+
+
+def test_superseded_rotation_is_dropped_unsent(hosts):
+    # Queued for tok-0, but the local active token is tok-1 by now.
+    sync_outbox.enqueue("rotate", {"current_qr_token": "tok-0"}, [A, B])
+    sync_outbox.drain(force=True)
+
+    assert hosts["posts"] == []
+    assert "rotate" not in _pending()
+    assert config_store.config_snapshot().get("last_sent_qr_token") != "tok-0"
+
+
+def test_retry_reuses_the_idempotency_key(hosts):
+    sync_outbox.enqueue("rotate", {"current_qr_token": "tok-1"}, [A])
+    entry_id = _pending()["rotate"]["id"]
+    hosts["down"].add(A)
+    assert sync_outbox.drain(force=True) == 0
+    assert _pending()["rotate"]["attempts"] == 1
+
+    hosts["down"].clear()
+    assert sync_outbox.drain(force=True) == 1
+    keys = [headers["Idempotency-Key"] for _, _, headers in hosts["posts"]]
+    assert keys == [entry_id, entry_id]
+
+
+def test_last_sent_token_is_set_only_after_every_host_acked(hosts):
+    sync_outbox.enqueue("rotate", {"current_qr_token": "tok-1"}, [A, B])
+    hosts["down"].add(B)
+    sync_outbox.drain(force=True)
+    assert _pending()["rotate"]["hosts"] == [B]
+    assert config_store.config_snapshot().get("last_sent_qr_token") != "tok-1"
+
+    hosts["down"].clear()
+    hosts["posts"].clear()
+    sync_outbox.drain(force=True)
+    assert [host for host, _, _ in hosts["posts"]] == [B]  # A already acked
+    assert "rotate" not in _pending()
+    assert config_store.config_snapshot()["last_sent_qr_token"] == "tok-1"
@@ -0,0 +1,30 @@
+import config_store
+import sync_client
+import sync_remote
+
+
+def _enable_sync():
+    config_store.update_config({"remote_sync_enabled": True, "remote_base_url": "https://host.example"})
+
+
+def test_failed_push_exits_non_zero(storage, monkeypatch, capsys):
+    _enable_sync()
+    result = {"host": "https://host.example", "ok": False, "status": 412, "error": "412", "attempts": 1, "elapsed_ms": 3}
+
+    def fail(cfg, force=False):
+        raise sync_client.FanOutError([result])
+
+    monkeypatch.setattr(sync_remote, "sync_all_to_remote", fail)
+    assert sync_remote.main([]) == 1
+    out = capsys.readouterr().out
+    assert "FAILED" in out
+    assert "--force" in out
+    assert "OK" not in out
+
+
+def test_successful_push_exits_zero(storage, monkeypatch, capsys):
+    _enable_sync()
+    result = {"host": "https://host.example", "ok": True, "status": 200, "error": None, "attempts": 1, "elapsed_ms": 3}
+    monkeypatch.setattr(sync_remote, "sync_all_to_remote", lambda cfg, force=False: [result])
+    assert sync_remote.main([]) == 0
+    assert "Remote sync: OK" in capsys.readouterr().out
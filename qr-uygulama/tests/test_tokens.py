@@ -0,0 +1,35 @@
+import time
+
+import config_store
+import gate
+
+
+def _create(client, auth, token, url="https://example.com/a", label=""):
+    r = client.post("/api/tokens", json={"tokens": [{"token": token, "redirect_url": url, "label": label}]}, headers=auth)
+    assert r.status_code == 200, r.get_json()
+
+
+def test_recreate_keeps_revocation(client, auth):
+    token = "tok_" + "a" * 20
+    _create(client, auth, token)
+    assert gate.resolve(token) == (302, "https://example.com/a")
+    created_at = config_store.get_qr_token(token)["created_at"]
+
+    r = client.post("/api/tokens/revoke", json={"tokens": [token]}, headers=auth)
+    assert r.status_code == 200
+    assert gate.resolve(token)[0] == 410
+
+    time.sleep(1.1)  # created_at has second resolution
+    _create(client, auth, token, url="https://example.com/b", label="again")
+    assert gate.resolve(token) == (410, gate.GONE_MESSAGE)
+    rec = config_store.get_qr_token(token)
+    assert rec["revoked"]
+    assert rec["created_at"] == created_at
+    assert rec["label"] == "again"
+
+
+def test_recreate_updates_live_token(client, auth):
+    token = "tok_" + "b" * 20
+    _create(client, auth, token)
+    _create(client, auth, token, url="https://example.com/b")
+    assert gate.resolve(token) == (302, "https://example.com/b")
@@ -1,3 +1,102 @@
-from app import app
+"""
+WSGI entry point (gunicorn wsgi:app).
 
+With QR_FAST_GATE=1, /r/<token>, /R/<token> and /status are answered by a thin
+pre-dispatch layer (no ProxyFix, request context or URL routing); everything
+else falls through to the Flask app unchanged.
+"""
 
+import json
+import os
+import time
+
+import gate_guard
+import metrics
+import scan_analytics
+from app import status_payload, app as flask_app
+
+
+class GateFastPath:
+    """
+    Answers the gate and /status directly; responses for a given redirect URL or
+    410 message are built once and reused.
+    """
+
+    def __init__(self, wsgi_app) -> None:
+        self.wsgi_app = wsgi_app
+        self._redirects: dict = {}
+        self._gone: dict = {}
+        body = gate_guard.RATE_LIMITED_MESSAGE.encode("utf-8")
+        self._limited = (
+            "429 TOO MANY REQUESTS",
+            [
+                ("Content-Type", "text/plain; charset=utf-8"),
+                ("Content-Length", str(len(body))),
+                ("Retry-After", str(gate_guard.RETRY_AFTER_S)),
+            ],
+            [body],
+        )
+
+    def _redirect(self, url: str):
+        cached = self._redirects.get(url)
+        if cached is None:
+            body = b"Redirecting..."
+            cached = (
+                "302 FOUND",
+                [
+                    ("Location", url),
+                    ("Content-Type", "text/plain; charset=utf-8"),
+                    ("Content-Length", str(len(body))),
+                ],
+                [body],
+            )
+            if len(self._redirects) < 10000:
+                self._redirects[url] = cached
+        return cached
+
+    def _gone_response(self, message: str):
+        cached = self._gone.get(message)
+        if cached is None:
+            body = message.encode("utf-8")
+            cached = (
+                "410 GONE",
+                [("Content-Type", "text/plain; charset=utf-8"), ("Content-Length", str(len(body)))],
+                [body],
+            )
+            self._gone[message] = cached
+        return cached
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO") or ""
+        method = environ.get("REQUEST_METHOD")
+        if method in ("GET", "HEAD"):
+            if path[:3] in ("/r/", "/R/") and len(path) > 3 and "/" not in path[3:]:
+                t0 = time.perf_counter()
+                token = path[3:]
+                ip = gate_guard.client_ip(environ.get("REMOTE_ADDR") or "", environ.get("HTTP_X_FORWARDED_FOR") or "")
+                code, value = gate_guard.check(token, ip)
+                if code == 429:
+                    status, headers, body = self._limited
+                else:
+                    scan_analytics.record(token, code == 302, environ.get("HTTP_USER_AGENT") or "")
+                    status, headers, body = self._redirect(value) if code == 302 else self._gone_response(value)
+                start_response(status, list(headers))
+                # Same route labels as the Flask rules.
+                metrics.observe_request(path[:3] + "<token>", method, code, time.perf_counter() - t0)
+                return body if method == "GET" else []
+            if path == "/status":
+                t0 = time.perf_counter()
+                body = json.dumps(status_payload()).encode("utf-8")
+                start_response(
+                    "200 OK",
+                    [("Content-Type", "application/json"), ("Content-Length", str(len(body)))],
+                )
+                metrics.observe_request("/status", method, 200, time.perf_counter() - t0)
+                return [body] if method == "GET" else []
+        return self.wsgi_app(environ, start_response)
+
+
+if (os.getenv("QR_FAST_GATE") or "").strip() == "1":
+    app = GateFastPath(flask_app)
+else:
+    app = flask_app